@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fifa21.settings')
 
 application = get_asgi_application()
+
+# Carrega o índice de jogadores antes da primeira requisição
+from players.index import warm_up  # noqa: E402
+
+warm_up()
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'players',
     'corsheaders',
@@ -55,6 +56,8 @@ MIDDLEWARE = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Layout do sprite de fotos (/api/players/image/sprite/), lido pelo frontend
+CORS_EXPOSE_HEADERS = ['X-Sprite-Ids', 'X-Sprite-Columns', 'X-Sprite-Tile-Size']
 
 ROOT_URLCONF = 'fifa21.urls'
 
@@ -114,6 +117,11 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,  # quantidade de jogadores por página
+    # Mesmo JSON do JSONRenderer padrão, serializado com orjson
+    'DEFAULT_RENDERER_CLASSES': [
+        'players.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 
@@ -136,6 +144,41 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Players data
+# Arquivo com a versão do dataset, compartilhado entre o servidor e os commands
+PLAYERS_DATASET_VERSION_FILE = os.getenv('PLAYERS_DATASET_VERSION_FILE', str(BASE_DIR / 'var' / 'dataset_version'))
+# Índice colunar em memória usado pelos endpoints de filtro e top-k
+PLAYERS_INDEX_ENABLED = os.getenv('PLAYERS_INDEX_ENABLED', 'True') == 'True'
+# Fotos dos jogadores: cache no cliente/CDN e offload opcional ao servidor web
+# ('x-accel-redirect' para nginx, 'x-sendfile' para Apache/lighttpd)
+PLAYERS_IMAGE_MAX_AGE = int(os.getenv('PLAYERS_IMAGE_MAX_AGE', 60 * 60 * 24))
+PLAYERS_IMAGE_SENDFILE = os.getenv('PLAYERS_IMAGE_SENDFILE', '')
+PLAYERS_IMAGE_ACCEL_PREFIX = os.getenv('PLAYERS_IMAGE_ACCEL_PREFIX', '/protected-media/')
+# Tamanhos (px) das versões reduzidas geradas pelo generate_image_derivatives
+PLAYERS_IMAGE_SIZES = (32, 64, 120)
+PLAYERS_IMAGE_AVIF = os.getenv('PLAYERS_IMAGE_AVIF', 'False') == 'True'
+# Cache das respostas dos endpoints de jogadores, invalidado pela versão do
+# dataset. BACKEND: 'lru' (memória do processo), 'django' (alias de CACHES em
+# OPTIONS), 'file' (diretório em OPTIONS) ou vazio para desligar.
+PLAYERS_RESPONSE_CACHE = {
+    'BACKEND': os.getenv('PLAYERS_RESPONSE_CACHE_BACKEND', 'lru'),
+    'OPTIONS': {},
+    'TIMEOUT': 300,
+    # TTL em segundos por endpoint (nome da URL); 0 desliga o cache no endpoint
+    'TIMEOUTS': {
+        'best-team': 3600,
+        'best-team-budget': 3600,
+        'players-top-k-by-criteria': 3600,
+        'players-filter': 600,
+    },
+}
+# Requisições idênticas simultâneas esperam até este tempo (s) pela que já está
+# calculando a resposta; 0 desliga a coalescência
+PLAYERS_SINGLE_FLIGHT_TIMEOUT = int(os.getenv('PLAYERS_SINGLE_FLIGHT_TIMEOUT', 30))
+# Limite de tempo padrão (s) do montador de time com orçamento; ao estourar,
+# devolve a melhor escalação encontrada até ali
+PLAYERS_SQUAD_TIME_LIMIT = float(os.getenv('PLAYERS_SQUAD_TIME_LIMIT', 2))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
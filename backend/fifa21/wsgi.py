@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fifa21.settings')
 
 application = get_wsgi_application()
+
+# Carrega o índice de jogadores antes da primeira requisição
+from players.index import warm_up  # noqa: E402
+
+warm_up()
@@ -1,5 +1,30 @@
 import pytest
-from players.models import Player
+from players import dataset
+from players.models import Player, PlayerPosition
+from players.rankings import refresh_rankings
+from players.summaries import refresh_summaries
+
+
+@pytest.fixture(autouse=True)
+def dataset_version_file(settings, tmp_path):
+    """Isola a versão do dataset de cada teste num arquivo temporário."""
+    settings.PLAYERS_DATASET_VERSION_FILE = str(tmp_path / "dataset_version")
+    return settings.PLAYERS_DATASET_VERSION_FILE
+
+
+@pytest.fixture(autouse=True)
+def response_cache(settings):
+    """Cache de respostas novo (e em memória) a cada teste."""
+    settings.PLAYERS_RESPONSE_CACHE = {**settings.PLAYERS_RESPONSE_CACHE, "BACKEND": "lru", "OPTIONS": {}}
+    return settings.PLAYERS_RESPONSE_CACHE
+
+
+@pytest.fixture(params=[True, False], ids=["index", "database"])
+def index_enabled(request, settings):
+    """Roda o teste duas vezes: com o índice em memória e direto no banco."""
+    settings.PLAYERS_INDEX_ENABLED = request.param
+    return request.param
+
 
 @pytest.fixture
 def sample_players(db):
@@ -84,4 +109,8 @@ def sample_players(db):
     
     # Cria os jogadores no banco de dados de teste
     created_players = Player.objects.bulk_create(players)
+    PlayerPosition.sync(created_players)
+    refresh_rankings()
+    refresh_summaries()
+    dataset.bump_version()
     return created_players
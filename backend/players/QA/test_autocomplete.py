@@ -0,0 +1,41 @@
+import pytest
+from rest_framework.test import APIClient
+from players import dataset
+from players.autocomplete import fold
+from players.models import Player
+
+
+def test_fold():
+    assert fold("Sergio Agüero") == "sergio aguero"
+    assert fold("  Atlético-Madrid ") == "atletico madrid"
+
+
+@pytest.mark.django_db
+def test_autocomplete(sample_players, index_enabled):
+    client = APIClient()
+
+    results = client.get("/api/players/autocomplete/?q=atle").json()["results"]
+    assert results[0] == {"type": "club", "label": "Atlético Madrid", "overall": 91, "players": 1}
+
+    # Prefixo de palavra, ordenado por overall
+    results = client.get("/api/players/autocomplete/?q=CA&types=player").json()["results"]
+    assert [r["label"] for r in results] == ["Casemiro", "Carvajal"]
+    assert results[0] == {
+        "type": "player", "sofifa_id": 200145, "label": "Casemiro", "detail": "Real Madrid", "overall": 89,
+    }
+
+    # Casamento exato do nome vem antes de overall maior
+    results = client.get("/api/players/autocomplete/?q=ramos").json()["results"]
+    assert results[0]["label"] == "Ramos"
+
+    results = client.get("/api/players/autocomplete/?q=lionel me").json()["results"]
+    assert [r["label"] for r in results] == ["Messi"]
+    assert client.get("/api/players/autocomplete/?q=spain prim").json()["results"][0]["type"] == "league"
+    assert client.get("/api/players/autocomplete/?q=").json() == {"results": []}
+    assert client.get("/api/players/autocomplete/?q=a&types=coach").status_code == 400
+
+    # Refeito quando o dataset muda
+    Player.objects.filter(sofifa_id=200389).update(short_name="Oblák")
+    dataset.bump_version()
+    results = client.get("/api/players/autocomplete/?q=oblak").json()["results"]
+    assert results[0]["label"] == "Oblák"
@@ -21,3 +21,28 @@ def test_best_team_filter_nationality(sample_players):
     results = data if isinstance (data, list) else data.get("results", data)
     for player in results:
         assert player["nationality"] == "Spain"
+
+@pytest.mark.django_db
+def test_best_team_optimal_assignment(sample_players, django_assert_num_queries):
+    client = APIClient()
+    with django_assert_num_queries(2):
+        response = client.get("/api/players/best-team/?formation=4-3-3")
+    assert response.status_code == 200
+    chosen = {p["sofifa_id"]: p["chosen_position"] for p in response.json()}
+    # Cada jogador ocupa a vaga da própria posição; Messi (RW, ST, CF) cabe em RW ou ST
+    assert chosen[200389] == "GK"
+    assert chosen[155862] == "CB"
+    assert chosen[200145] == "CDM"
+    assert chosen[204963] == "RB"
+    assert chosen[158023] in ("RW", "ST")
+
+@pytest.mark.django_db
+def test_best_team_custom_and_invalid_formation(sample_players):
+    client = APIClient()
+    response = client.get("/api/players/best-team/?formation=3-5-2")
+    assert response.status_code == 200
+    assert {p["chosen_position"] for p in response.json()} >= {"GK", "CB", "CDM", "ST"}
+
+    response = client.get("/api/players/best-team/?formation=9-9-9")
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Invalid formation: '9-9-9'")
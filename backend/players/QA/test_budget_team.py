@@ -0,0 +1,160 @@
+import pytest
+from rest_framework.test import APIClient
+from players import dataset
+from players.budget import budget_lineup
+from players.models import Player, PlayerPosition
+from players.solver import FORMATIONS
+
+
+@pytest.fixture
+def squad_players(sample_players):
+    """Completa o elenco de exemplo com jogadores baratos de todas as posições."""
+    positions = ["GK", "RB", "CB", "CB", "LB", "CDM", "CM", "CM", "LW", "ST", "RW", "RW"]
+    players = [
+        Player(
+            sofifa_id=900000 + i,
+            player_url=f"https://sofifa.com/player/{900000 + i}",
+            short_name=f"Reserva {i}",
+            long_name=f"Jogador Reserva {i}",
+            age=22,
+            club_name="Reservas FC",
+            league_name="Spain Primera Division",
+            nationality="Spain",
+            player_positions=position,
+            overall=70 + i % 3,
+            real_face="",
+            potential=80,
+            value_eur=1000000 + i * 100000,
+        )
+        for i, position in enumerate(positions)
+    ]
+    PlayerPosition.sync(Player.objects.bulk_create(players))
+    dataset.bump_version()
+    return Player.objects.all()
+
+
+def brute_force(slots, players, budget):
+    # Soma de overall da melhor escalação, testando todas as combinações
+    best = None
+
+    def search(k, used, cost, score):
+        nonlocal best
+        if k == len(slots):
+            best = score if best is None else max(best, score)
+            return
+        for player in players:
+            fits = slots[k] in player["player_positions"].split(", ")
+            if player["sofifa_id"] not in used and fits and cost + player["value_eur"] <= budget:
+                search(k + 1, used | {player["sofifa_id"]}, cost + player["value_eur"], score + player["overall"])
+
+    search(0, frozenset(), 0, 0)
+    return best
+
+
+@pytest.mark.django_db
+def test_budget_team_respects_budget(squad_players, index_enabled):
+    client = APIClient()
+
+    rich = client.get("/api/players/best-team/budget/?budget=1000000000").json()
+    assert rich["optimal"] is True
+    assert {p["sofifa_id"] for p in rich["players"]} >= {158023, 200389, 155862, 200145, 204963}
+
+    # Sem dinheiro para Messi (67,5 mi) e Oblak (75 mi) juntos
+    response = client.get("/api/players/best-team/budget/?budget=150000000&formation=4-3-3")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_value_eur"] <= 150000000
+    assert data["total_value_eur"] == sum(p["value_eur"] for p in data["players"])
+    assert data["total_score"] == sum(p["overall"] for p in data["players"])
+    assert [p["chosen_position"] for p in data["players"]] == FORMATIONS["4-3-3"]
+    assert len({p["sofifa_id"] for p in data["players"]}) == 11
+    assert data["total_score"] < rich["total_score"]
+
+
+@pytest.mark.django_db
+def test_budget_team_is_optimal(squad_players):
+    slots = ["GK", "CB", "CB", "RW"]
+    players = list(squad_players.values("sofifa_id", "player_positions", "value_eur", "overall"))
+
+    for budget in (6e6, 3e7, 7e7, 1.5e8, 3e8):
+        lineup, optimal = budget_lineup(slots, players, budget)
+        assert optimal
+        assert sum(player["overall"] for _, player in lineup) == brute_force(slots, players, budget)
+        assert sum(player["value_eur"] for _, player in lineup) <= budget
+
+
+@pytest.mark.django_db
+def test_budget_team_without_binding_budget_is_best_team(squad_players):
+    from players.models import split_positions
+    from players.solver import best_lineup
+
+    slots = FORMATIONS["3-5-2"]
+    players = list(squad_players.values("sofifa_id", "player_positions", "value_eur", "overall"))
+    best = best_lineup(slots, [(p, set(split_positions(p["player_positions"])), p["overall"]) for p in players])
+
+    # Orçamento folgado: a mesma escalação do melhor time, provada ótima na hora
+    lineup, optimal = budget_lineup(slots, players, 1e12, time_limit=0.5)
+    assert optimal
+    assert sum(p["overall"] for _, p in lineup) == sum(p["overall"] for _, p in best)
+
+
+@pytest.mark.django_db
+def test_budget_team_errors(squad_players):
+    client = APIClient()
+    assert client.get("/api/players/best-team/budget/").status_code == 400
+    assert client.get("/api/players/best-team/budget/?budget=-1").status_code == 400
+    for params in ("budget=inf", "budget=nan", "budget=1e9&time_limit=inf"):
+        response = client.get(f"/api/players/best-team/budget/?{params}")
+        assert response.status_code == 400
+        assert params.rsplit("&", 1)[-1].split("=")[0] in response.json()
+    assert client.get("/api/players/best-team/budget/?budget=1e9&metric=age").status_code == 400
+    # Nem os 11 mais baratos cabem no orçamento
+    response = client.get("/api/players/best-team/budget/?budget=5000000")
+    assert response.status_code == 400
+    assert "budget" in response.json()
+
+
+@pytest.mark.django_db
+def test_budget_team_does_not_cache_partial_lineups(squad_players, monkeypatch):
+    from players import views
+
+    def cut_short(*args, **kwargs):
+        lineup, _ = budget_lineup(*args, **kwargs)
+        return lineup, False
+
+    client = APIClient()
+    monkeypatch.setattr(views, "budget_lineup", cut_short)
+    response = client.get("/api/players/best-team/budget/?budget=150000000")
+    assert response.json()["optimal"] is False
+    assert response["X-Cache"] == "MISS"
+    # Nem browsers e CDNs guardam ou revalidam a escalação parcial
+    assert "no-store" in response["Cache-Control"]
+    assert not response.has_header("ETag") and not response.has_header("Last-Modified")
+    # Uma escalação interrompida pelo limite de tempo não fica no cache
+    assert client.get("/api/players/best-team/budget/?budget=150000000")["X-Cache"] == "MISS"
+
+    monkeypatch.undo()
+    response = client.get("/api/players/best-team/budget/?budget=150000000")
+    assert response["X-Cache"] == "MISS"
+    assert response.has_header("ETag") and "Cache-Control" not in response
+    assert client.get("/api/players/best-team/budget/?budget=150000000")["X-Cache"] == "HIT"
+
+
+@pytest.mark.django_db
+def test_budget_team_keeps_value_max(squad_players, index_enabled):
+    response = APIClient().get("/api/players/best-team/budget/?budget=1e9&value_max=2000000")
+    assert response.status_code == 200
+    # O orçamento não afrouxa o value_max pedido
+    assert all(p["value_eur"] <= 2000000 for p in response.json()["players"])
+
+
+@pytest.mark.django_db
+def test_budget_team_time_limit_without_lineup(squad_players, monkeypatch):
+    from players import views
+
+    monkeypatch.setattr(views, "budget_lineup", lambda *args, **kwargs: (None, False))
+    response = APIClient().get("/api/players/best-team/budget/?budget=150000000")
+    # Tempo esgotado não é o mesmo que orçamento insuficiente
+    assert response.status_code == 503
+    assert "no-store" in response["Cache-Control"] and not response.has_header("ETag")
+    assert "time_limit" in response.json()["detail"]
@@ -0,0 +1,105 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from django.core.management import call_command
+from players.models import Player
+
+PNG = b"\x89PNG\r\n\x1a\n-fake-face"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """CDN falso: responde 429 uma vez por imagem e depois 200/304 com ETag."""
+
+    requests = []
+    throttled = set()
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in self.throttled:
+            self.throttled.add(self.path)
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(PNG)))
+        self.end_headers()
+        self.wfile.write(PNG)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_cdn():
+    StubHandler.requests = []
+    StubHandler.throttled = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.django_db
+def test_download_all_images_against_stub(sample_players, stub_cdn, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    canonical = dict(Player.objects.values_list("sofifa_id", "real_face"))
+    call_command("download_all_images", "--base-url", stub_cdn, "--checkpoint", checkpoint, "--batch-size", "2")
+
+    for player in Player.objects.all():
+        assert player.real_face_local.name == f"players_images/{player.sofifa_id}.png"
+        # O servidor de testes não substitui a URL canônica da foto
+        assert player.real_face == canonical[player.sofifa_id]
+        with open(player.real_face_local.path, "rb") as f:
+            assert f.read() == PNG
+
+    # Segunda execução: só requisições condicionais, respondidas com 304
+    StubHandler.requests = []
+    call_command("download_all_images", "--base-url", stub_cdn, "--checkpoint", checkpoint)
+    assert len(StubHandler.requests) == len(sample_players)
+    assert all(etag for _, etag in StubHandler.requests)
+
+
+@pytest.mark.django_db
+def test_download_all_images_resumes_from_checkpoint(sample_players, stub_cdn, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    checkpoint = tmp_path / "checkpoint.json"
+    checkpoint.write_text('{"finished": false, "done": [158023, 155862], "validators": {}}')
+
+    call_command("download_all_images", "--base-url", stub_cdn, "--checkpoint", str(checkpoint))
+
+    requested = {path for path, _ in StubHandler.requests}
+    assert not any(path.startswith("/158/023/") or path.startswith("/155/862/") for path in requested)
+    assert len(requested) == len(sample_players) - 2
+
+
+@pytest.mark.django_db
+def test_download_all_images_drops_stale_pack(sample_players, stub_cdn, settings, tmp_path):
+    from django.test import Client
+    from players.images import pack_paths, write_pack
+
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    old_face = tmp_path / "old.png"
+    old_face.write_bytes(b"\x89PNG-old")
+    write_pack("png", [(158023, str(old_face))])
+    assert Client().get("/api/players/image/158023/").content == b"\x89PNG-old"
+
+    call_command("download_all_images", "--base-url", stub_cdn, "--checkpoint", str(tmp_path / "checkpoint.json"))
+
+    # O pacote antigo não pode mais esconder a foto nova
+    assert not any(os.path.exists(path) for path in pack_paths("png"))
+    response = Client().get("/api/players/image/158023/")
+    assert b"".join(response.streaming_content) == PNG
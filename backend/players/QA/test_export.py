@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+import pytest
+from django.test import Client
+
+
+@pytest.mark.django_db
+def test_export_csv(sample_players):
+    response = Client().get("/api/players/export/?league_name=Spain&overall_min=89&fields=sofifa_id,short_name,overall")
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    assert response["Content-Disposition"] == 'attachment; filename="players.csv"'
+
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert rows == [
+        ["sofifa_id", "short_name", "overall"],
+        ["158023", "Messi", "93"],
+        ["200389", "Oblak", "91"],
+        ["155862", "Ramos", "89"],
+        ["200145", "Casemiro", "89"],
+    ]
+
+
+@pytest.mark.django_db
+def test_export_ndjson(sample_players, settings):
+    client = Client()
+    response = client.get("/api/players/export/?format=ndjson&player_positions=CB,RB")
+    assert response["Content-Type"] == "application/x-ndjson"
+
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    players = [json.loads(line) for line in lines]
+    assert [p["short_name"] for p in players] == ["Ramos", "Carvajal"]
+    assert players[0] == client.get("/api/players/155862/").json()
+
+    empty = client.get("/api/players/export/?nationality=Italy")
+    assert b"".join(empty.streaming_content).decode().strip().startswith("sofifa_id,real_face_local")
+
+    assert client.get("/api/players/export/?format=xml").status_code == 400
+    assert client.get("/api/players/export/?fields=salary").status_code == 400
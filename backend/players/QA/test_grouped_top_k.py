@@ -0,0 +1,61 @@
+import pytest
+from rest_framework.test import APIClient
+from players.topk import grouped_top_k
+
+
+@pytest.mark.django_db
+def test_grouped_top_k_by_club(sample_players):
+    response = APIClient().get("/api/players/top-k/grouped/?group_by=club&k=2&fields=short_name,overall")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["group_by"] == ["club"] and data["k"] == 2 and data["metric"] == "overall"
+    assert data["groups"] == [
+        {"group": {"club": "Atlético Madrid"}, "players": [{"short_name": "Oblak", "overall": 91}]},
+        {"group": {"club": "FC Barcelona"}, "players": [{"short_name": "Messi", "overall": 93}]},
+        {"group": {"club": "Real Madrid"}, "players": [
+            {"short_name": "Ramos", "overall": 89},
+            {"short_name": "Casemiro", "overall": 89},
+        ]},
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("use_window", [True, False])
+def test_grouped_top_k_window_and_heap_agree(sample_players, use_window):
+    groups = grouped_top_k({"league_name": "Spain"}, ["league", "position"], 1, "value_eur", ("short_name",), use_window)
+    assert [(g["group"]["position"], g["players"][0]["short_name"]) for g in groups] == [
+        ("CB", "Ramos"), ("CDM", "Casemiro"), ("CF", "Messi"), ("GK", "Oblak"),
+        ("RB", "Carvajal"), ("RW", "Messi"), ("ST", "Messi"),
+    ]
+    assert groups[0]["group"] == {"league": "Spain Primera Division", "position": "CB"}
+
+    by_potential = grouped_top_k({}, ["nationality"], 2, "potential", ("short_name",), use_window)
+    spain = next(g for g in by_potential if g["group"]["nationality"] == "Spain")
+    assert [p["short_name"] for p in spain["players"]] == ["Ramos", "Carvajal"]
+
+
+@pytest.mark.django_db
+def test_grouped_top_k_validation(sample_players):
+    client = APIClient()
+    assert client.get("/api/players/top-k/grouped/").status_code == 400
+    assert client.get("/api/players/top-k/grouped/?group_by=coach").status_code == 400
+    assert client.get("/api/players/top-k/grouped/?group_by=club&metric=height").status_code == 400
+    assert client.get("/api/players/top-k/grouped/?group_by=club&k=0").status_code == 400
+
+
+@pytest.mark.django_db
+def test_top_k_metric(sample_players, index_enabled):
+    response = APIClient().get("/api/players/top-k/?k=2&metric=value_eur")
+    assert [p["short_name"] for p in response.json()["results"]] == ["Oblak", "Messi"]
+    assert APIClient().get("/api/players/top-k/?metric=height").status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", ["/api/players/top-k/", "/api/players/top-by-criteria/"])
+def test_top_k_invalid_k(sample_players, index_enabled, url):
+    client = APIClient()
+    for k in ("abc", "0", "1001"):
+        response = client.get(f"{url}?k={k}")
+        assert response.status_code == 400
+        assert "k" in response.json()
+    assert client.get(f"{url}?k=2").status_code == 200
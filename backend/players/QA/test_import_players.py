@@ -0,0 +1,109 @@
+import csv
+import pytest
+from django.core.management import call_command
+from players.models import ImportChangeset, Player, PlayerPosition
+
+FIELDS = [
+    "sofifa_id", "player_url", "short_name", "long_name", "age", "club_name",
+    "league_name", "nationality", "player_positions", "overall", "potential", "value_eur",
+]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def make_row(sofifa_id, **overrides):
+    row = {
+        "sofifa_id": sofifa_id,
+        "player_url": f"https://sofifa.com/player/{sofifa_id}",
+        "short_name": f"Player {sofifa_id}",
+        "long_name": f"Player Long {sofifa_id}",
+        "age": 25,
+        "club_name": "Club",
+        "league_name": "League",
+        "nationality": "Brazil",
+        "player_positions": "ST, CF",
+        "overall": 80,
+        "potential": 85,
+        "value_eur": "1000000.0",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.django_db
+def test_import_players_upserts_in_batches(tmp_path):
+    rows = [make_row(100000 + i) for i in range(5)] + [make_row("invalid")]
+    call_command("import_players", write_csv(tmp_path / "a.csv", rows), "--batch-size", "2")
+
+    assert Player.objects.count() == 5
+    assert PlayerPosition.objects.filter(position="CF").count() == 5
+
+    rows = [make_row(100000, overall=90, player_positions="CB")]
+    call_command("import_players", write_csv(tmp_path / "b.csv", rows))
+
+    player = Player.objects.get(sofifa_id=100000)
+    assert player.overall == 90
+    assert list(player.positions.values_list("position", flat=True)) == ["CB"]
+    assert Player.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_import_players_incremental_writes_only_delta(tmp_path):
+    rows = [make_row(100000 + i) for i in range(4)]
+    call_command("import_players", write_csv(tmp_path / "a.csv", rows))
+    Player.objects.filter(sofifa_id=100001).update(real_face_local="players_images/100001.png")
+
+    rows = [
+        make_row(100000),
+        make_row(100001, overall=91),
+        make_row(100002),
+        make_row(100009),
+    ]
+    call_command("import_players", write_csv(tmp_path / "b.csv", rows), "--incremental")
+
+    changeset = ImportChangeset.objects.first()
+    assert changeset.incremental
+    assert changeset.added == [100009]
+    assert changeset.changed == [100001]
+    assert changeset.removed == [100003]
+    assert changeset.version
+
+    assert set(Player.objects.values_list("sofifa_id", flat=True)) == {100000, 100001, 100002, 100009}
+    updated = Player.objects.get(sofifa_id=100001)
+    assert updated.overall == 91
+    assert updated.real_face_local == "players_images/100001.png"
+
+    call_command("import_players", write_csv(tmp_path / "c.csv", rows), "--incremental")
+    assert not ImportChangeset.objects.first().affected_ids()
+
+
+@pytest.mark.django_db
+def test_import_players_refreshes_rankings(tmp_path):
+    rows = [
+        make_row(100000, overall=80, league_name="A", player_positions="CB, RB"),
+        make_row(100001, overall=85, league_name="B"),
+        make_row(100002, overall=82, league_name="A", player_positions="GK"),
+    ]
+    call_command("import_players", write_csv(tmp_path / "a.csv", rows))
+
+    ranks = {
+        p.sofifa_id: (p.primary_position, p.rank_overall, p.rank_in_league, p.rank_in_position)
+        for p in Player.objects.all()
+    }
+    assert ranks == {
+        100000: ("CB", 3, 2, 1),
+        100001: ("ST", 1, 1, 1),
+        100002: ("GK", 2, 1, 1),
+    }
+
+    # Jogador alterado na incremental reordena os rankings
+    rows[0]["overall"] = 90
+    call_command("import_players", write_csv(tmp_path / "b.csv", rows), "--incremental")
+    assert Player.objects.get(sofifa_id=100000).rank_overall == 1
+    assert Player.objects.get(sofifa_id=100001).rank_overall == 2
@@ -0,0 +1,39 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+def _walk(client, url):
+    ids, pages = [], 0
+    while url:
+        data = client.get(url).json()
+        ids += [p["sofifa_id"] for p in data["results"]]
+        url = data["next"]
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("endpoint", ["/api/players/", "/api/players/filter/", "/api/players/search/"])
+def test_cursor_pagination_walks_catalogue(sample_players, endpoint, index_enabled):
+    client = APIClient()
+
+    ids, pages = _walk(client, f"{endpoint}?pagination=cursor&page_size=2")
+
+    # Ordem (-overall, sofifa_id), sem repetições; empates (89) desempatados pelo id
+    assert ids == [158023, 200389, 155862, 200145, 204963]
+    assert pages == 3
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_count_is_optional(sample_players):
+    client = APIClient()
+
+    data = client.get("/api/players/?cursor=&page_size=2").json()
+    assert data["count"] == 5
+
+    data = client.get("/api/players/?cursor=&page_size=2&count=false").json()
+    assert "count" not in data
+    assert len(data["results"]) == 2
+
+    response = client.get("/api/players/?cursor=invalid!")
+    assert response.status_code == 404
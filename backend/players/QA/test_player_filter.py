@@ -24,3 +24,61 @@ def test_player_filter_age_invalid(sample_players):
     client = APIClient()
     response = client.get("/api/players/filter/?age_min=-5")
     assert response.status_code in [400, 200]  # depende da validação implementada
+
+@pytest.mark.django_db
+def test_player_filter_positions_exact(sample_players, index_enabled):
+    client = APIClient()
+
+    response = client.get("/api/players/filter/?player_positions=C")
+    assert response.json()["results"] == []
+
+    response = client.get("/api/players/filter/?player_positions=cb,cdm")
+    sofifa_ids = {p["sofifa_id"] for p in response.json()["results"]}
+    assert sofifa_ids == {155862, 200145}
+
+
+@pytest.mark.django_db
+def test_filter_facets(sample_players, index_enabled):
+    client = APIClient()
+
+    response = client.get(
+        "/api/players/filter/?club_name=Real Madrid&overall_min=88"
+        "&facets=club_name,nationality,player_positions,overall"
+    )
+    data = response.json()
+    assert [p["short_name"] for p in data["results"]] == ["Ramos", "Casemiro"]
+
+    facets = data["facets"]
+    # A faceta de clubes ignora o próprio filtro de clube
+    assert facets["club_name"] == [
+        {"value": "Real Madrid", "count": 2},
+        {"value": "Atlético Madrid", "count": 1},
+        {"value": "FC Barcelona", "count": 1},
+    ]
+    assert facets["nationality"] == [{"value": "Brazil", "count": 1}, {"value": "Spain", "count": 1}]
+    assert facets["player_positions"] == [{"value": "CB", "count": 1}, {"value": "CDM", "count": 1}]
+    # E a de overall ignora overall_min
+    assert facets["overall"] == [
+        {"value": "85-89", "min": 85, "max": 89, "count": 3},
+    ]
+
+    assert "facets" not in client.get("/api/players/filter/?club_name=Real").json()
+    assert client.get("/api/players/filter/?facets=age").status_code == 400
+
+
+@pytest.mark.django_db
+def test_player_filter_value_bounds(sample_players, index_enabled):
+    client = APIClient()
+
+    response = client.get("/api/players/filter/?value_min=6.75e7&value_max=67500000.5")
+    assert {p["sofifa_id"] for p in response.json()["results"]} == {158023}
+
+    # Número inválido é erro, não um filtro ignorado em silêncio
+    for params in ("value_max=abc", "value_min=nan", "value_max=inf"):
+        response = client.get(f"/api/players/filter/?{params}")
+        assert response.status_code == 400
+        assert params.split("=")[0] in response.json()
+    # Idade e nota inválidas continuam sendo ignoradas
+    assert client.get("/api/players/filter/?age_min=abc").status_code == 200
+
+    assert client.get("/api/players/export/?value_max=1e8x").status_code == 400
@@ -0,0 +1,126 @@
+import io
+import os
+import pytest
+from django.test import Client
+from players import dataset
+
+
+@pytest.fixture
+def face(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    os.makedirs(tmp_path / "players_images")
+    path = tmp_path / "players_images" / "158023.png"
+    path.write_bytes(b"\x89PNG-messi")
+    return path
+
+
+@pytest.mark.django_db
+def test_player_image_without_database(face, django_assert_num_queries):
+    client = Client()
+    with django_assert_num_queries(0):
+        response = client.get("/api/players/image/158023/")
+
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == b"\x89PNG-messi"
+    assert response["Content-Type"] == "image/png"
+    assert response["Cache-Control"].startswith("public, max-age=")
+    assert response["ETag"].startswith('"')
+    assert response["Last-Modified"]
+
+
+@pytest.mark.django_db
+def test_player_image_conditional_requests(face):
+    client = Client()
+    response = client.get("/api/players/image/158023/")
+
+    cached = client.get("/api/players/image/158023/", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert cached.status_code == 304
+    assert cached["ETag"] == response["ETag"]
+
+    cached = client.get("/api/players/image/158023/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+    assert cached.status_code == 304
+
+    assert client.get("/api/players/image/999999/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_player_image_accel_redirect(face, settings):
+    settings.PLAYERS_IMAGE_SENDFILE = "x-accel-redirect"
+    response = Client().get("/api/players/image/158023/")
+
+    assert response.status_code == 200
+    assert response["X-Accel-Redirect"] == "/protected-media/players_images/158023.png"
+    assert response.content == b""
+
+
+@pytest.mark.django_db
+def test_player_image_derivatives_negotiation(settings, tmp_path):
+    from PIL import Image
+    from django.core.management import call_command
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    os.makedirs(tmp_path / "players_images")
+    Image.new("RGBA", (120, 120), (200, 30, 30, 255)).save(tmp_path / "players_images" / "158023.png")
+
+    version = dataset.bump_version()
+    call_command("generate_image_derivatives", "--workers", "1")
+    assert (tmp_path / "players_images" / "derivatives" / "64" / "158023.webp").exists()
+    # Só arquivos de imagem mudaram: caches e índices dos jogadores continuam valendo
+    assert dataset.current_version() == version
+
+    client = Client()
+    response = client.get("/api/players/image/158023/?size=50", HTTP_ACCEPT="image/webp,image/*")
+    assert response["Content-Type"] == "image/webp"
+    assert "Accept" in response["Vary"]
+    with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+        assert image.size == (64, 64)
+
+    response = client.get("/api/players/image/158023/?size=50", HTTP_ACCEPT="image/png")
+    assert response["Content-Type"] == "image/png"
+
+
+@pytest.mark.django_db
+def test_player_image_served_from_pack(face, django_assert_num_queries):
+    from django.core.management import call_command
+
+    call_command("pack_player_images")
+    os.remove(face)
+
+    client = Client()
+    with django_assert_num_queries(0):
+        response = client.get("/api/players/image/158023/")
+    assert response.status_code == 200
+    assert response.content == b"\x89PNG-messi"
+    assert response["Content-Type"] == "image/png"
+
+    cached = client.get("/api/players/image/158023/", HTTP_IF_NONE_MATCH=response["ETag"])
+    assert cached.status_code == 304
+
+
+@pytest.mark.django_db
+def test_player_sprite(settings, tmp_path):
+    from PIL import Image
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    os.makedirs(tmp_path / "players_images")
+    Image.new("RGBA", (120, 120), (200, 30, 30, 255)).save(tmp_path / "players_images" / "158023.png")
+
+    client = Client()
+    response = client.get("/api/players/image/sprite/?ids=158023,20801,158023&size=32&columns=2")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/png"
+    assert response["X-Sprite-Ids"] == "158023,20801,158023"
+    assert response["X-Sprite-Columns"] == "2"
+    assert response["X-Sprite-Tile-Size"] == "32"
+    with Image.open(io.BytesIO(response.content)) as sprite:
+        assert sprite.size == (64, 64)
+        assert sprite.getpixel((16, 16))[3] == 255
+        assert sprite.getpixel((48, 16))[3] == 0
+
+    cached = client.get(
+        "/api/players/image/sprite/?ids=158023,20801,158023&size=32&columns=2",
+        HTTP_IF_NONE_MATCH=response["ETag"],
+    )
+    assert cached.status_code == 304
+
+    assert client.get("/api/players/image/sprite/?ids=abc").status_code == 400
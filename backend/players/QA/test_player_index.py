@@ -0,0 +1,75 @@
+import pytest
+from rest_framework.test import APIClient
+from players import dataset
+from players.index import get_player_index
+from players.models import Player
+
+
+def _ids(response):
+    data = response.json()
+    results = data if isinstance(data, list) else data.get("results", data)
+    return [p["sofifa_id"] for p in results]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url", [
+    "/api/players/filter/?league_name=spain&overall_min=89",
+    "/api/players/filter/?club_name=Real&age_max=30",
+    "/api/players/filter/?player_positions=st",
+    "/api/players/top-k/?k=3&league_name=Primera",
+    "/api/players/top-by-criteria/?k=2&criteria=club&value=Madrid",
+])
+def test_index_matches_database(sample_players, settings, url):
+    client = APIClient()
+    from_index = _ids(client.get(url))
+
+    settings.PLAYERS_INDEX_ENABLED = False
+    from_database = _ids(client.get(url))
+
+    assert from_index == from_database
+    assert from_index
+
+
+@pytest.mark.django_db
+def test_top_k_is_ordered_by_overall(sample_players):
+    client = APIClient()
+    response = client.get("/api/players/top-k/?k=3")
+    assert _ids(response) == [158023, 200389, 155862]
+
+
+@pytest.mark.django_db
+def test_index_rebuilds_after_version_bump(sample_players):
+    index = get_player_index()
+    assert len(index) == len(sample_players)
+
+    Player.objects.filter(sofifa_id=158023).delete()
+    assert get_player_index() is index
+
+    dataset.bump_version()
+    assert len(get_player_index()) == len(sample_players) - 1
+
+
+def test_versioned_builds_once_per_version():
+    import threading
+    import time
+
+    builds = []
+
+    def build(version):
+        builds.append(version)
+        time.sleep(0.05)
+        return f"built-{version}"
+
+    get = dataset.versioned(build)
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Várias threads com a versão desatualizada: só uma reconstrói
+    assert builds == ["0"]
+    assert get() == "built-0"
+
+    version = dataset.bump_version()
+    assert get() == f"built-{version}"
+    assert builds == ["0", version]
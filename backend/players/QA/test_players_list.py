@@ -29,4 +29,113 @@ def test_players_filter_age(sample_players):
         assert 27 <= age <= 35, f"Jogador {player.get('short_name')} fora do intervalo: {age}"
 
     # Opcional: garante que pelo menos um jogador do intervalo foi retornado
-    assert len(results) > 0, "Nenhum jogador encontrado no intervalo de idade 27-35"
\ No newline at end of file
+    assert len(results) > 0, "Nenhum jogador encontrado no intervalo de idade 27-35"
+
+@pytest.mark.django_db
+def test_fast_serialization_matches_player_serializer(sample_players):
+    from rest_framework.renderers import JSONRenderer
+    from players.models import Player
+    from players.renderers import ORJSONRenderer
+    from players.serializers import PlayerSerializer, player_data, player_values
+
+    Player.objects.filter(sofifa_id=158023).update(real_face_local="players_images/158023.png", long_name="Lionel\u2028Messi")
+    queryset = Player.objects.order_by("-overall", "sofifa_id")
+
+    expected = JSONRenderer().render(PlayerSerializer(queryset, many=True).data)
+    assert ORJSONRenderer().render([player_data(row) for row in player_values(queryset)]) == expected
+
+    response = APIClient().get("/api/players/?page_size=100")
+    assert response.content == JSONRenderer().render({
+        "count": 5, "next": None, "previous": None,
+        "results": PlayerSerializer(queryset, many=True).data,
+    })
+
+    detail = APIClient().get("/api/players/158023/")
+    assert detail.content == JSONRenderer().render(PlayerSerializer(queryset.get(sofifa_id=158023)).data)
+    assert APIClient().get("/api/players/1/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_sparse_fieldsets(sample_players, index_enabled):
+    client = APIClient()
+
+    response = client.get("/api/players/filter/?fields=sofifa_id,short_name,overall&nationality=Spain")
+    assert response.status_code == 200
+    assert response.json()["results"] == [
+        {"sofifa_id": 155862, "short_name": "Ramos", "overall": 89},
+        {"sofifa_id": 204963, "short_name": "Carvajal", "overall": 86},
+    ]
+
+    response = client.get("/api/players/?exclude=player_url,real_face,long_name&pagination=cursor&page_size=2")
+    first = response.json()["results"][0]
+    assert "player_url" not in first and "long_name" not in first
+    assert first["real_face_local"] == "/placeholder.svg"
+    next_page = client.get(response.json()["next"]).json()["results"]
+    assert [p["sofifa_id"] for p in next_page] == [155862, 200145]
+
+    assert client.get("/api/players/158023/?fields=short_name").json() == {"short_name": "Messi"}
+    assert client.get("/api/players/?fields=salary").status_code == 400
+
+    lineup = client.get("/api/players/best-team/?fields=short_name").json()
+    assert set(lineup[0]) == {"short_name", "chosen_position"}
+
+
+@pytest.mark.django_db
+def test_sparse_fieldsets_defer_columns(sample_players, settings):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    settings.PLAYERS_INDEX_ENABLED = False
+    with CaptureQueriesContext(connection) as queries:
+        APIClient().get("/api/players/search/?q=Messi&fields=short_name")
+    select = queries.captured_queries[-1]["sql"].split(" FROM ")[0]
+    assert "short_name" in select
+    assert "player_url" not in select and "long_name" not in select
+
+
+@pytest.mark.django_db
+def test_dataset_version_conditional_requests(sample_players, django_assert_num_queries):
+    from players import dataset
+
+    client = APIClient()
+    response = client.get("/api/players/filter/?nationality=Spain")
+    etag = response["ETag"]
+    assert response["Last-Modified"]
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/players/filter/?nationality=Spain", HTTP_IF_NONE_MATCH=etag)
+    assert cached.status_code == 304
+
+    # Outra consulta, outro ETag
+    assert client.get("/api/players/filter/?nationality=Brazil")["ETag"] != etag
+
+    dataset.bump_version()
+    response = client.get("/api/players/filter/?nationality=Spain", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+    detail = client.get("/api/players/158023/")
+    assert client.get("/api/players/158023/", HTTP_IF_NONE_MATCH=detail["ETag"]).status_code == 304
+    best_team = client.get("/api/players/best-team/")
+    assert client.get("/api/players/best-team/", HTTP_IF_NONE_MATCH=best_team["ETag"]).status_code == 304
+
+
+@pytest.mark.django_db
+def test_players_batch(sample_players, index_enabled, django_assert_max_num_queries):
+    client = APIClient()
+    client.get("/api/players/batch/?ids=1")  # constrói o índice
+
+    with django_assert_max_num_queries(1):
+        response = client.get("/api/players/batch/?ids=200389,1,158023,200389")
+    data = response.json()
+    assert [p["sofifa_id"] for p in data["results"]] == [200389, 158023]
+    assert data["missing"] == [1]
+    assert data["results"][1] == client.get("/api/players/158023/").json()
+
+    response = client.post("/api/players/batch/?fields=short_name", {"ids": [155862, 204963]}, format="json")
+    assert response.json() == {"results": [{"short_name": "Ramos"}, {"short_name": "Carvajal"}], "missing": []}
+
+    assert client.get("/api/players/batch/?ids=abc").status_code == 400
+    assert client.get("/api/players/batch/").status_code == 400
+    assert client.get("/api/players/batch/?ids=" + ",".join(map(str, range(101)))).status_code == 400
+    assert client.post("/api/players/batch/", {"ids": "158023"}, format="json").status_code == 400
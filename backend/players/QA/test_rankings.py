@@ -0,0 +1,96 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from players import dataset, rankings
+from players.models import Player
+
+
+def current_ranks():
+    return {
+        p.sofifa_id: (p.rank_overall, p.rank_in_league, p.rank_in_nationality, p.rank_in_position)
+        for p in Player.objects.all()
+    }
+
+
+@pytest.mark.django_db
+def test_rankings_follow_listing_order(sample_players):
+    # Empates de overall desempatados por sofifa_id, como nas listagens
+    assert current_ranks() == {
+        158023: (1, 1, 1, 1),
+        200389: (2, 2, 1, 1),
+        155862: (3, 3, 1, 1),
+        200145: (4, 4, 1, 1),
+        204963: (5, 5, 2, 1),
+    }
+    assert Player.objects.get(sofifa_id=158023).primary_position == "RW"
+
+
+@pytest.mark.django_db
+def test_python_fallback_matches_sql(sample_players):
+    expected = current_ranks()
+    Player.objects.update(rank_overall=None, rank_in_league=None, rank_in_nationality=None, rank_in_position=None)
+
+    assert rankings._refresh_ranks_python(batch_size=2) == len(expected)
+    assert current_ranks() == expected
+    # Nada mudou: nenhuma linha regravada
+    assert rankings.refresh_rankings() == 0
+
+
+@pytest.mark.django_db
+def test_refresh_rankings_command_bumps_version(sample_players):
+    Player.objects.filter(sofifa_id=204963).update(overall=95)
+    version = dataset.current_version()
+
+    call_command("refresh_rankings")
+
+    assert dataset.current_version() != version
+    assert current_ranks()[204963] == (1, 1, 1, 1)
+    assert current_ranks()[155862] == (4, 4, 2, 1)
+
+
+@pytest.mark.django_db
+def test_top_k_reads_materialized_rank(sample_players, settings):
+    settings.PLAYERS_INDEX_ENABLED = False
+    client = APIClient()
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/api/players/top-k/?k=3")
+    assert [p["sofifa_id"] for p in response.json()["results"]] == [158023, 200389, 155862]
+    assert [p["rank_overall"] for p in response.json()["results"]] == [1, 2, 3]
+    assert any("rank_overall" in q["sql"] and "ORDER BY" in q["sql"] for q in queries.captured_queries)
+
+    # Sem ranking (banco antigo), volta para a ordenação por overall
+    Player.objects.filter(sofifa_id=204963).update(rank_overall=None)
+    dataset.bump_version()
+    response = client.get("/api/players/top-k/?k=3")
+    assert [p["sofifa_id"] for p in response.json()["results"]] == [158023, 200389, 155862]
+
+
+@pytest.mark.django_db
+def test_grouped_top_k_uses_rank_in_group(sample_players):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get("/api/players/top-k/grouped/?group_by=nationality&k=1")
+    groups = {g["group"]["nationality"]: [p["sofifa_id"] for p in g["players"]] for g in response.json()["groups"]}
+    assert groups["Spain"] == [155862]
+    assert len(groups) == 4
+    assert not any("ROW_NUMBER" in q["sql"] for q in queries.captured_queries)
+
+
+@pytest.mark.django_db
+def test_admin_bumps_version_after_commit(sample_players, django_capture_on_commit_callbacks):
+    from django.contrib.admin.sites import site
+
+    player = Player.objects.get(sofifa_id=204963)
+    player.overall = 95
+    version = dataset.current_version()
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        site._registry[Player].save_model(None, player, None, True)
+        # Ainda dentro da transação: a versão não pode ter mudado
+        assert dataset.current_version() == version
+
+    assert len(callbacks) == 1
+    assert dataset.current_version() != version
+    assert current_ranks()[204963][0] == 1
@@ -0,0 +1,161 @@
+import pytest
+from rest_framework.test import APIClient
+from players import dataset
+from players.models import Player
+from players.response_cache import DjangoCacheBackend, FileBackend, LRUBackend, get_response_cache
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("backend", ["lru", "django", "file"])
+def test_response_cache_hit_and_invalidation(sample_players, settings, tmp_path, backend, django_assert_num_queries):
+    options = {"directory": str(tmp_path / "cache")} if backend == "file" else {}
+    settings.PLAYERS_RESPONSE_CACHE = {**settings.PLAYERS_RESPONSE_CACHE, "BACKEND": backend, "OPTIONS": options}
+    settings.PLAYERS_INDEX_ENABLED = False
+    client = APIClient()
+
+    first = client.get("/api/players/best-team/?league_name=Spain")
+    assert first["X-Cache"] == "MISS"
+
+    with django_assert_num_queries(0):
+        second = client.get("/api/players/best-team/?league_name=Spain&nationality=")
+    assert second["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second["Content-Type"] == first["Content-Type"]
+
+    # Nova importação: a resposta anterior não pode ser servida
+    Player.objects.filter(sofifa_id=158023).update(short_name="L. Messi")
+    dataset.bump_version()
+    third = client.get("/api/players/best-team/?league_name=Spain")
+    assert third["X-Cache"] == "MISS"
+    assert "L. Messi" in third.content.decode()
+
+    assert get_response_cache().stats()["best-team"] == {"hits": 1, "misses": 2, "coalesced": 0}
+
+
+@pytest.mark.django_db
+def test_response_cache_per_endpoint_ttl(sample_players, settings):
+    settings.PLAYERS_RESPONSE_CACHE = {
+        **settings.PLAYERS_RESPONSE_CACHE, "TIMEOUTS": {"players-filter": 0},
+    }
+    client = APIClient()
+    client.get("/api/players/filter/?nationality=Spain")
+    response = client.get("/api/players/filter/?nationality=Spain")
+    assert "X-Cache" not in response
+
+    assert client.get("/api/players/?page_size=2")["X-Cache"] == "MISS"
+    assert client.get("/api/players/?page_size=2")["X-Cache"] == "HIT"
+
+
+def test_lru_backend_bounds():
+    cache = LRUBackend(max_entries=2, max_bytes=10)
+    cache.set("a", (200, [], b"1234"), 60)
+    cache.set("b", (200, [], b"1234"), 60)
+    assert cache.get("a") is not None
+    cache.set("c", (200, [], b"1234"), 60)
+    # "b" era a menos usada recentemente
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+    cache.set("d", (200, [], b"123456789"), 60)
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.get("d") is not None
+
+    cache.set("e", (200, [], b"x"), -1)
+    assert cache.get("e") is None
+
+
+
+def test_file_backend_evicts_expired_entries(tmp_path):
+    cache = FileBackend(str(tmp_path), max_entries=2, sweep_every=3)
+    value = (200, [], b"x")
+
+    cache.set("aa-expired", value, -1)
+    assert cache.get("aa-expired") is None
+    assert not (tmp_path / "aa" / "aa-expired").exists()
+
+    (tmp_path / "bb").mkdir()
+    (tmp_path / "bb" / "bb-broken").write_bytes(b"not a pickle")
+    assert cache.get("bb-broken") is None
+    assert not (tmp_path / "bb" / "bb-broken").exists()
+
+    # A cada três gravações o diretório é varrido: saem os expirados e, acima
+    # de max_entries, os que expiram primeiro
+    cache.set("cc-expired", value, -1)
+    cache.set("dd-short", value, 60)
+    cache.set("ee-long", value, 600)
+    cache.set("ff-long", value, 600)
+    cache.set("gg-long", value, 600)
+    assert sorted(p.name for p in tmp_path.rglob("*") if p.is_file()) == ["ff-long", "gg-long"]
+    assert cache.get("gg-long") == value
+
+
+def test_django_backend_clear_keeps_other_keys():
+    from django.core.cache import cache as default_cache
+
+    default_cache.set("unrelated", "kept")
+    cache = DjangoCacheBackend()
+    cache.set("key", (200, [], b"x"), 60)
+    assert cache.get("key") == (200, [], b"x")
+
+    cache.clear()
+    assert cache.get("key") is None
+    assert default_cache.get("unrelated") == "kept"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_identical_requests_are_coalesced(sample_players, monkeypatch):
+    import threading
+    import time
+    from django.db import connection
+    from players.views import BestTeamView
+
+    calls = []
+    get_candidates = BestTeamView.get_candidates
+
+    def slow_get_candidates(self, *args, **kwargs):
+        calls.append(1)
+        time.sleep(0.3)
+        return get_candidates(self, *args, **kwargs)
+
+    monkeypatch.setattr(BestTeamView, "get_candidates", slow_get_candidates)
+    barrier = threading.Barrier(6)
+    responses = []
+
+    def request():
+        barrier.wait()
+        try:
+            responses.append(APIClient().get("/api/players/best-team/?formation=4-4-2"))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len({response.content for response in responses}) == 1
+    assert sorted(response["X-Cache"] for response in responses).count("MISS") == 1
+    assert get_response_cache().stats()["best-team"]["coalesced"] >= 1
+
+
+def test_file_lock_excludes_other_holders(settings, tmp_path):
+    import threading
+    from players.singleflight import _file_lock
+
+    results = []
+
+    def try_lock():
+        with _file_lock("best-team", timeout=0.1) as acquired:
+            results.append(acquired)
+
+    with _file_lock("best-team", timeout=1) as acquired:
+        assert acquired
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+    assert results == [False]
+
+    with _file_lock("best-team", timeout=0.1) as acquired:
+        assert acquired
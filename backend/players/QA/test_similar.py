@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from rest_framework.test import APIClient
+from players.similar import get_similarity_index
+
+
+@pytest.mark.django_db
+def test_similar_players_match_brute_force(sample_players, index_enabled):
+    response = APIClient().get("/api/players/155862/similar/?k=3")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["player"]["sofifa_id"] == 155862
+    results = body["results"]
+    assert 155862 not in [p["sofifa_id"] for p in results]
+
+    # Mesmo resultado de uma busca exaustiva sobre os vetores
+    index = get_similarity_index()
+    row = index.players.row_by_id[155862]
+    distances = np.linalg.norm(index.vectors - index.vectors[row], axis=1)
+    expected = [int(index.players.sofifa_id[i]) for i in np.argsort(distances, kind="stable") if i != row][:3]
+    assert [p["sofifa_id"] for p in results] == expected
+    assert [p["distance"] for p in results] == sorted(p["distance"] for p in results)
+
+
+@pytest.mark.django_db
+def test_similar_players_filters_and_fields(sample_players):
+    client = APIClient()
+
+    response = client.get("/api/players/155862/similar/?k=10&value_max=60000000&fields=sofifa_id,value_eur")
+    results = response.json()["results"]
+    assert results and all(p["value_eur"] <= 60000000 for p in results)
+    assert set(results[0]) == {"sofifa_id", "value_eur", "distance"}
+
+    assert client.get("/api/players/155862/similar/?league_name=Ligue").json()["results"] == []
+    assert client.get("/api/players/1/similar/").status_code == 404
+    assert client.get("/api/players/155862/similar/?k=0").status_code == 400
+
+
+@pytest.mark.django_db
+def test_similar_players_batch(sample_players):
+    client = APIClient()
+    single = client.get("/api/players/200389/similar/?k=2").json()["results"]
+
+    response = client.post("/api/players/similar/?k=2", {"ids": [200389, 1, 158023]}, format="json")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["sofifa_id"] for item in body["results"]] == [200389, 158023]
+    assert body["results"][0]["similar"] == single
+    assert body["missing"] == [1]
+    assert client.get("/api/players/similar/?ids=158023,204963").json()["missing"] == []
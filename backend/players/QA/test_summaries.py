@@ -0,0 +1,81 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from players import dataset
+from players.models import ClubSummary, LeagueSummary, Player
+
+
+@pytest.mark.django_db
+def test_club_summaries(sample_players):
+    response = APIClient().get("/api/clubs/")
+
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+    clubs = {club["name"]: club for club in response.json()["results"]}
+    assert [club["name"] for club in response.json()["results"]] == ["FC Barcelona", "Atlético Madrid", "Real Madrid"]
+
+    madrid = clubs["Real Madrid"]
+    assert madrid["league_name"] == "Spain Primera Division"
+    assert madrid["player_count"] == 3
+    assert madrid["avg_overall"] == pytest.approx(88.0)
+    assert madrid["total_value_eur"] == sum(p.value_eur for p in sample_players if p.club_name == "Real Madrid")
+    # Só três jogadores: o melhor time tem três vagas preenchidas, nas suas posições
+    assert {(p["position"], p["sofifa_id"]) for p in madrid["best_xi"]} == {
+        ("CB", 155862), ("CDM", 200145), ("RB", 204963),
+    }
+    assert madrid["best_xi_rating"] == pytest.approx(88.0)
+
+
+@pytest.mark.django_db
+def test_league_summaries_sorting_and_filters(sample_players):
+    client = APIClient()
+
+    league = client.get("/api/leagues/").json()["results"][0]
+    assert league["name"] == "Spain Primera Division"
+    assert league["player_count"] == 5
+    assert league["club_count"] == 3
+    assert len(league["best_xi"]) == 5
+
+    response = client.get("/api/clubs/?ordering=player_count&league_name=primera&page_size=2")
+    assert [club["name"] for club in response.json()["results"]] == ["Atlético Madrid", "FC Barcelona"]
+    assert response.json()["next"] is not None
+
+    assert client.get("/api/clubs/?q=real").json()["count"] == 1
+    assert client.get("/api/clubs/?ordering=-club_count").status_code == 400
+
+
+@pytest.mark.django_db
+def test_refresh_summaries_command(sample_players):
+    Player.objects.filter(club_name="FC Barcelona").update(club_name="Paris Saint-Germain", league_name="Ligue 1")
+    version = dataset.current_version()
+
+    call_command("refresh_summaries")
+
+    assert dataset.current_version() != version
+    assert not ClubSummary.objects.filter(name="FC Barcelona").exists()
+    assert ClubSummary.objects.get(name="Paris Saint-Germain").league_name == "Ligue 1"
+    assert LeagueSummary.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_admin_refreshes_only_affected_summaries(sample_players, django_capture_on_commit_callbacks):
+    from django.contrib.admin.sites import site
+
+    untouched = ClubSummary.objects.get(name="Atlético Madrid").pk
+    player = Player.objects.get(sofifa_id=204963)
+    player.club_name = "FC Barcelona"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        site._registry[Player].save_model(None, player, None, True)
+        # Resumos só mudam depois do commit
+        assert ClubSummary.objects.get(name="Real Madrid").player_count == 3
+
+    counts = dict(ClubSummary.objects.values_list("name", "player_count"))
+    assert counts == {"FC Barcelona": 2, "Real Madrid": 2, "Atlético Madrid": 1}
+    # O clube que não foi tocado não é regravado
+    assert ClubSummary.objects.get(name="Atlético Madrid").pk == untouched
+    assert LeagueSummary.objects.get(name="Spain Primera Division").player_count == 5
+
+    with django_capture_on_commit_callbacks(execute=True):
+        site._registry[Player].delete_queryset(None, Player.objects.filter(club_name="Atlético Madrid"))
+    assert not ClubSummary.objects.filter(name="Atlético Madrid").exists()
@@ -1,6 +1,11 @@
 from django.contrib import admin
+from django.db import transaction
+from django.urls import reverse
 from django.utils.html import format_html
-from .models import Player
+from . import dataset
+from .models import ImportChangeset, Player, PlayerPosition
+from .rankings import refresh_rankings
+from .summaries import SUMMARIES, refresh_summaries
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -10,7 +15,58 @@ class PlayerAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
         if obj.real_face_local:
-            # Usa a URL do ImageField
-            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 50%;" />', obj.real_face_local.url)
+            # Versão reduzida servida pela API, no tamanho exibido
+            url = reverse('player-image', args=[obj.sofifa_id]) + '?size=50'
+            return format_html('<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 50%;" />', url)
         return "-"
     image_preview.short_description = "Foto"
+
+    # Qualquer alteração pelo admin recalcula os rankings, os resumos dos clubes
+    # e ligas envolvidos e invalida os índices em memória. Tudo roda depois do
+    # commit: antes disso outro processo reconstruiria índices e caches com as
+    # linhas antigas, já sob a versão nova
+    def save_model(self, request, obj, form, change):
+        # O clube e a liga antigos também perdem o jogador
+        groups = list(Player.objects.filter(pk=obj.pk).values(*SUMMARIES))
+        super().save_model(request, obj, form, change)
+        PlayerPosition.sync([obj])
+        self.refresh_on_commit(groups + [{column: getattr(obj, column) for column in SUMMARIES}])
+
+    def delete_model(self, request, obj):
+        groups = [{column: getattr(obj, column) for column in SUMMARIES}]
+        super().delete_model(request, obj)
+        self.refresh_on_commit(groups)
+
+    def delete_queryset(self, request, queryset):
+        groups = list(queryset.values(*SUMMARIES))
+        super().delete_queryset(request, queryset)
+        self.refresh_on_commit(groups)
+
+    def refresh_on_commit(self, rows):
+        groups = {column: {row[column] for row in rows} for column in SUMMARIES}
+
+        def refresh():
+            refresh_rankings()
+            refresh_summaries(groups=groups)
+            dataset.bump_version()
+
+        transaction.on_commit(refresh)
+
+
+@admin.register(ImportChangeset)
+class ImportChangesetAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'source', 'incremental', 'added_count', 'changed_count', 'removed_count')
+    readonly_fields = ('created_at', 'source', 'version', 'incremental', 'added', 'changed', 'removed')
+
+    def added_count(self, obj):
+        return len(obj.added)
+    added_count.short_description = "Novos"
+
+    def changed_count(self, obj):
+        return len(obj.changed)
+    changed_count.short_description = "Alterados"
+
+    def removed_count(self, obj):
+        return len(obj.removed)
+    removed_count.short_description = "Removidos"
+
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import pre_migrate
+
+
+def create_postgres_extensions(using, **kwargs):
+    # Os índices de trigramas dependem da extensão pg_trgm
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
 
 
 class PlayersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'players'
+
+    def ready(self):
+        pre_migrate.connect(create_postgres_extensions, sender=self)
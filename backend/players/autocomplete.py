@@ -0,0 +1,137 @@
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from . import dataset
+from .index import get_player_index
+from .models import Player
+
+# Índice de prefixos para o autocomplete.
+#
+# Nomes de jogadores, clubes e ligas são normalizados (sem acentos, minúsculos)
+# e quebrados em palavras. Cada palavra e o nome completo viram termos de uma
+# lista ordenada; um prefixo é um intervalo contíguo dessa lista, achado com
+# bisect. O ranking (qualidade do casamento, depois overall) é feito com NumPy
+# sobre os candidatos do intervalo. O índice é refeito quando a versão do
+# dataset muda.
+
+TYPES = ('player', 'club', 'league')
+# Qualidade do casamento (menor é melhor)
+EXACT, NAME_PREFIX, WORD_PREFIX = 0, 1, 2
+
+
+def fold(text):
+    """Remove acentos e caixa: "Agüero" -> "aguero"."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in stripped.casefold()).split())
+
+
+class AutocompleteIndex:
+    def __init__(self, version, players):
+        self.version = version
+        entries = []
+        clubs = {}
+        leagues = {}
+
+        for player in players:
+            entries.append((
+                'player',
+                [player['short_name'], player['long_name']],
+                player['overall'],
+                {
+                    'type': 'player',
+                    'sofifa_id': player['sofifa_id'],
+                    'label': player['short_name'],
+                    'detail': player['club_name'],
+                    'overall': player['overall'],
+                },
+            ))
+            for groups, name in ((clubs, player['club_name']), (leagues, player['league_name'])):
+                if name:
+                    groups.setdefault(name, []).append(player['overall'])
+
+        for kind, groups, detail in (('club', clubs, 'players'), ('league', leagues, 'players')):
+            for name, overalls in groups.items():
+                overall = round(sum(overalls) / len(overalls))
+                entries.append((kind, [name], overall, {
+                    'type': kind, 'label': name, 'overall': overall, detail: len(overalls),
+                }))
+
+        self.results = [entry[3] for entry in entries]
+        self.type = np.array([TYPES.index(entry[0]) for entry in entries], dtype=np.int8)
+        self.overall = np.array([entry[2] for entry in entries], dtype=np.int32)
+        self.names = [[fold(name) for name in entry[1] if name] for entry in entries]
+
+        terms = []
+        for i, names in enumerate(self.names):
+            for name in names:
+                terms.append((name, True, i))
+                terms.extend((word, False, i) for word in name.split() if word != name)
+        terms.sort()
+        self.terms = [term for term, _, _ in terms]
+        self.term_is_name = np.array([is_name for _, is_name, _ in terms], dtype=bool)
+        self.term_entry = np.array([i for _, _, i in terms], dtype=np.int64)
+
+    def _range(self, prefix):
+        lo = bisect_left(self.terms, prefix)
+        return lo, bisect_left(self.terms, prefix + '\U0010ffff', lo)
+
+    def candidates(self, query, tokens):
+        """Entradas que casam com a busca e a qualidade de cada casamento."""
+        # Nomes completos começando pela busca inteira (e palavras, se for um termo só)
+        lo, hi = self._range(query)
+        exact_hi = bisect_right(self.terms, query, lo, hi)
+        is_name = self.term_is_name[lo:hi]
+        quality = np.full(hi - lo, WORD_PREFIX, dtype=np.int8)
+        quality[is_name] = NAME_PREFIX
+        quality[:exact_hi - lo][is_name[:exact_hi - lo]] = EXACT
+        ids = self.term_entry[lo:hi]
+
+        if len(tokens) > 1:
+            # Cada palavra da busca é prefixo de alguma palavra do nome
+            words = None
+            for token in sorted(tokens, key=len, reverse=True):
+                token_ids = np.unique(self.term_entry[slice(*self._range(token))])
+                words = token_ids if words is None else np.intersect1d(words, token_ids, assume_unique=True)
+                if len(words) == 0:
+                    break
+            ids = np.concatenate([ids, words])
+            quality = np.concatenate([quality, np.full(len(words), WORD_PREFIX, dtype=np.int8)])
+
+        # Melhor qualidade de cada entrada
+        order = np.lexsort((quality, ids))
+        ids, quality = ids[order], quality[order]
+        first = np.ones(len(ids), dtype=bool)
+        first[1:] = ids[1:] != ids[:-1]
+        return ids[first], quality[first]
+
+    def search(self, query, limit=10, types=TYPES):
+        query = fold(query)
+        tokens = query.split()
+        if not tokens:
+            return []
+
+        ids, quality = self.candidates(query, tokens)
+        if len(types) < len(TYPES):
+            keep = np.isin(self.type[ids], [TYPES.index(kind) for kind in types])
+            ids, quality = ids[keep], quality[keep]
+
+        order = np.lexsort((ids, -self.overall[ids], quality))[:limit]
+        return [self.results[i] for i in ids[order]]
+
+
+def build_autocomplete_index(version):
+    """Nomes de jogadores, clubes, ligas e nacionalidades, lidos do índice de jogadores se houver."""
+    player_index = get_player_index()
+    if player_index is not None:
+        players = player_index.rows
+    else:
+        players = Player.objects.values(
+            'sofifa_id', 'short_name', 'long_name', 'club_name', 'league_name', 'overall'
+        )
+    return AutocompleteIndex(version, players)
+
+
+get_autocomplete_index = dataset.versioned(build_autocomplete_index)
@@ -0,0 +1,300 @@
+import heapq
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from .models import split_positions
+from .solver import OUT_OF_POSITION_PENALTY, best_lineup, linear_sum_assignment
+
+# Melhor time dentro de um orçamento.
+#
+# Maximiza a soma de overall (ou potential) das vagas da formação com a soma
+# de value_eur limitada ao orçamento: uma atribuição de vagas a jogadores
+# distintos com uma restrição de mochila. Jogadores fora de posição entram com
+# a mesma penalidade do solver do BestTeamView.
+#
+# 1. Poda: numa escalação ótima, um jogador com pelo menos len(slots)
+#    "dominantes" na posição (nota >= e valor <=) pode sempre ser trocado por
+#    um dominante livre, então só os demais são candidatos (alguns por posição
+#    em vez de milhares).
+# 2. Sem orçamento: o melhor time dos candidatos (o mesmo best_lineup do
+#    BestTeamView). Se ele cabe no orçamento, é a resposta.
+# 3. Relaxação lagrangiana: para todo λ >= 0, a melhor atribuição com notas
+#    nota - λ·valor, mais λ·orçamento, limita qualquer escalação dentro do
+#    orçamento e já respeita jogadores distintos. O λ do menor limite sai por
+#    planos de corte; as atribuições que cabem no orçamento encontradas no
+#    caminho são as primeiras escalações candidatas.
+# 4. Branch and bound: as vagas são preenchidas uma a uma. Cada filho passa
+#    primeiro pela relaxação linear da mochila de múltipla escolha das vagas
+#    restantes (barata, pré-calculada como função côncava do orçamento) e, se
+#    sobreviver, pela atribuição lagrangiana das vagas restantes. Os filhos
+#    são visitados do maior limite para o menor.
+# 5. Limite de tempo: ao estourar, devolve a melhor escalação encontrada.
+
+SQUAD_METRICS = ('overall', 'potential')
+MAX_TIME_LIMIT = 10.0
+
+
+class TimeLimitReached(Exception):
+    pass
+
+
+def prune(players, slots, metric):
+    """Candidatos de cada posição da formação: [(nota, valor, i), ...] da melhor nota para a pior."""
+    keep = len(slots)
+    positions = set(slots)
+    order = sorted(range(len(players)), key=lambda i: (
+        players[i]['value_eur'] or 0, -players[i][metric], players[i]['sofifa_id'],
+    ))
+
+    # Das len(slots) maiores notas vistas até aqui (todas com valor menor ou igual)
+    best = {position: [] for position in positions}
+    best_any = []
+    inside = {position: [] for position in positions}
+    anywhere = []
+
+    def undominated(heap, score):
+        if len(heap) == keep and heap[0] >= score:
+            return False
+        if len(heap) == keep:
+            heapq.heapreplace(heap, score)
+        else:
+            heapq.heappush(heap, score)
+        return True
+
+    for i in order:
+        score = players[i][metric]
+        for position in positions.intersection(split_positions(players[i]['player_positions'])):
+            if undominated(best[position], score):
+                inside[position].append(i)
+        if undominated(best_any, score):
+            anywhere.append(i)
+
+    candidates = {}
+    for position in positions:
+        eligible = set(inside[position])
+        # Fora de posição só é preciso considerar os não dominados no geral
+        entries = [(players[i][metric], i) for i in inside[position]] + [
+            (players[i][metric] - OUT_OF_POSITION_PENALTY, i) for i in anywhere if i not in eligible
+        ]
+        candidates[position] = sorted(
+            ((score, players[i]['value_eur'] or 0, i) for score, i in entries),
+            key=lambda c: (-c[0], c[1], players[c[2]]['sofifa_id']),
+        )
+    return candidates
+
+
+def hull(candidates):
+    """Menor valor, nota nesse valor e segmentos (Δvalor, Δnota) da envoltória côncava."""
+    front = []
+    for score, value, _ in sorted(candidates, key=lambda c: (c[1], -c[0])):
+        if not front or score > front[-1][1]:
+            while len(front) >= 2 and (
+                (front[-1][1] - front[-2][1]) * (value - front[-2][0])
+                <= (score - front[-2][1]) * (front[-1][0] - front[-2][0])
+            ):
+                front.pop()
+            front.append((value, score))
+    base_value, base_score = front[0]
+    return base_value, base_score, [
+        (value - front[k][0], score - front[k][1]) for k, (value, score) in enumerate(front[1:])
+    ]
+
+
+class Bound:
+    """Relaxação linear de um conjunto de vagas em função do orçamento."""
+
+    def __init__(self, hulls):
+        self.base_value = sum(h[0] for h in hulls)
+        self.base_score = sum(h[1] for h in hulls)
+        segments = sorted((s for h in hulls for s in h[2]), key=lambda s: s[1] / s[0], reverse=True)
+        self.costs = [0.0]
+        self.scores = [0.0]
+        self.slopes = []
+        for cost, score in segments:
+            self.costs.append(self.costs[-1] + cost)
+            self.scores.append(self.scores[-1] + score)
+            self.slopes.append(score / cost)
+
+    def __call__(self, budget):
+        extra = budget - self.base_value
+        if extra < 0:
+            return float('-inf')
+        k = bisect_right(self.costs, extra) - 1
+        score = self.base_score + self.scores[k]
+        if k < len(self.slopes):
+            score += self.slopes[k] * (extra - self.costs[k])
+        return score
+
+
+def assignment(weights, allowed):
+    """Atribuição de peso máximo das linhas (vagas) a colunas (jogadores) distintas.
+
+    Só usa as entradas marcadas em ``allowed``. Retorna (peso total, coluna de
+    cada linha), ou (-inf, None) se não há atribuição completa.
+    """
+    k, m = weights.shape
+    if k == 0:
+        return 0.0, np.zeros(0, dtype=np.int64)
+    if m < k or not allowed.any(axis=1).all():
+        return float('-inf'), None
+
+    columns = np.arange(m)
+    if m > k * k:
+        # Uma atribuição ótima só usa, em cada linha, uma das k melhores colunas
+        top = np.argpartition(np.where(allowed, weights, -np.inf), m - k, axis=1)[:, m - k:]
+        columns = np.unique(top)
+        weights, allowed = weights[:, columns], allowed[:, columns]
+
+    # Entradas proibidas ficam abaixo de qualquer atribuição só com permitidas
+    low, high = weights[allowed].min(), weights[allowed].max()
+    missing = low - k * (high - low) - 1
+    rows, cols = np.array(linear_sum_assignment(-np.where(allowed, weights, missing))).T
+    if not allowed[rows, cols].all():
+        return float('-inf'), None
+    return float(weights[rows, cols].sum()), columns[cols]
+
+
+def lagrangian(scores, values, allowed, budget, deadline):
+    """Menor limite lagrangiano do orçamento por planos de corte.
+
+    Retorna (λ, limite, melhor atribuição no orçamento ou None), com cada
+    atribuição como (nota, valor, colunas).
+    """
+    def solve(weights):
+        _, cols = assignment(weights, allowed)
+        if cols is None:
+            return None
+        return float(scores[np.arange(len(cols)), cols].sum()), float(values[cols].sum()), cols
+
+    top = solve(scores)
+    if top is None:
+        return 0.0, float('-inf'), None
+    if top[1] <= budget:
+        return 0.0, top[0], top
+    cheap = solve(np.broadcast_to(-values, scores.shape))
+    if cheap[1] > budget:
+        return 0.0, float('-inf'), None
+
+    # top estoura o orçamento e cheap cabe: o λ ótimo está entre as retas dos dois
+    over, under, feasible = top, cheap, cheap
+    best_lam, bound = 0.0, top[0]
+    while time.monotonic() < deadline:
+        lam = (over[0] - under[0]) / (over[1] - under[1])
+        point = solve(scores - lam * values)
+        relaxed = point[0] - lam * point[1]
+        if relaxed + lam * budget < bound:
+            best_lam, bound = lam, relaxed + lam * budget
+        if relaxed <= over[0] - lam * over[1] + 1e-9 * (abs(relaxed) + 1):
+            break
+        if point[1] > budget:
+            over = point
+        else:
+            under = point
+            if point[0] > feasible[0]:
+                feasible = point
+    return best_lam, bound, feasible
+
+
+def budget_lineup(slots, players, budget, metric='overall', time_limit=2.0):
+    """Escalação de maior nota total com valor total <= ``budget``.
+
+    ``players`` são dicts com sofifa_id, player_positions, value_eur e a
+    métrica. Retorna (lista de (posição da vaga, jogador) na ordem das vagas,
+    ou None se nenhuma escalação cabe no orçamento, e se a busca terminou
+    antes do limite de tempo, ou seja, se a escalação é ótima).
+    """
+    deadline = time.monotonic() + time_limit
+    players = [player for player in players if (player['value_eur'] or 0) <= budget]
+    candidates = prune(players, slots, metric)
+    pool = sorted({i for candidate_list in candidates.values() for _, _, i in candidate_list})
+    if len(pool) < len(slots) or not all(candidates.values()):
+        return None, True
+
+    lineup = best_lineup(slots, [
+        (i, set(split_positions(players[i]['player_positions'])), players[i][metric]) for i in pool
+    ])
+    if sum(players[i]['value_eur'] or 0 for _, i in lineup) <= budget:
+        return [(slot, players[i]) for slot, i in lineup], True
+
+    # Vagas mais restritas primeiro; vagas iguais lado a lado. Jogadores
+    # viram colunas do pool
+    order = sorted(range(len(slots)), key=lambda s: (len(candidates[slots[s]]), slots[s]))
+    column = {i: c for c, i in enumerate(pool)}
+    lists = [[(score, value, column[i]) for score, value, i in candidates[slots[s]]] for s in order]
+    values = np.array([players[i]['value_eur'] or 0 for i in pool], dtype=np.float64)
+    scores = np.zeros((len(slots), len(pool)))
+    allowed = np.zeros((len(slots), len(pool)), dtype=bool)
+    for depth, candidate_list in enumerate(lists):
+        for score, _, c in candidate_list:
+            scores[depth, c] = score
+            allowed[depth, c] = True
+
+    lam, root_bound, feasible = lagrangian(scores, values, allowed, budget, deadline)
+    if feasible is None:
+        return None, True
+
+    hulls = [hull(candidate_list) for candidate_list in lists]
+    bounds = [Bound(hulls[depth:]) for depth in range(len(slots) + 1)]
+    reduced = scores - lam * values
+    depths = np.arange(len(slots))
+
+    best = {'score': feasible[0], 'lineup': list(feasible[2])}
+    chosen = [None] * len(slots)
+    used = np.zeros(len(pool), dtype=bool)
+
+    def improves(bound):
+        # Notas são inteiras: só vale a pena um ramo que supere a melhor em 1
+        return bound >= best['score'] + 1 - 1e-6
+
+    def search(depth, start, remaining, score):
+        if depth == len(slots):
+            best['score'], best['lineup'] = score, list(chosen)
+            return
+        if time.monotonic() > deadline:
+            raise TimeLimitReached
+
+        free = np.flatnonzero(~used)
+        relaxed, cols = assignment(reduced[depth:, free], allowed[depth:, free])
+        if cols is None or not improves(score + relaxed + lam * remaining):
+            return
+        # A atribuição relaxada que cabe no orçamento já é uma escalação
+        cols = free[cols]
+        if values[cols].sum() <= remaining:
+            total = score + scores[depths[depth:], cols].sum()
+            if total > best['score']:
+                best['score'], best['lineup'] = total, chosen[:depth] + list(cols)
+            if not improves(score + relaxed + lam * remaining):
+                return
+
+        # Filhos na ordem do limite superior: a primeira descida já acha uma
+        # escalação boa e os demais ramos são cortados cedo
+        rest = bounds[depth + 1]
+        children = []
+        for j in range(start, len(lists[depth])):
+            candidate_score, value, c = lists[depth][j]
+            if value <= remaining and not used[c]:
+                children.append((score + candidate_score + rest(remaining - value), j))
+        children.sort(key=lambda child: (-child[0], child[1]))
+
+        same_next = depth + 1 < len(slots) and slots[order[depth + 1]] == slots[order[depth]]
+        for bound, j in children:
+            if not improves(bound):
+                break
+            candidate_score, value, c = lists[depth][j]
+            used[c] = True
+            chosen[depth] = c
+            # Vagas iguais escolhem em ordem crescente da lista (sem permutações)
+            search(depth + 1, j + 1 if same_next else 0, remaining - value, score + candidate_score)
+            used[c] = False
+
+    optimal = True
+    if improves(root_bound):
+        try:
+            search(0, 0, budget, 0)
+        except TimeLimitReached:
+            optimal = False
+
+    by_slot = dict(zip(order, best['lineup']))
+    return [(slots[s], players[pool[by_slot[s]]]) for s in range(len(slots))], optimal
@@ -0,0 +1,88 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+# Versão global do dataset de jogadores.
+#
+# Fica num arquivo pequeno para ser compartilhada entre os processos web e os
+# management commands (que rodam em processos separados). Ler a versão custa
+# apenas um os.stat(); o conteúdo só é relido quando o arquivo é trocado.
+
+_lock = threading.Lock()
+_cached_key = None
+_cached_version = "0"
+
+
+def _version_path():
+    return Path(settings.PLAYERS_DATASET_VERSION_FILE)
+
+
+def current_version():
+    global _cached_key, _cached_version
+
+    path = _version_path()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "0"
+
+    key = (str(path), st.st_ino, st.st_mtime_ns)
+    if key != _cached_key:
+        with _lock:
+            if key != _cached_key:
+                _cached_version = path.read_text().strip() or "0"
+                _cached_key = key
+    return _cached_version
+
+
+_MISSING = object()
+
+
+def versioned(builder, key=current_version):
+    """Getter que guarda ``builder(chave)`` e só o reconstrói quando ``key()`` muda.
+
+    A chave padrão é a versão do dataset. Com a chave em dia, a leitura não
+    pega lock; quando ela muda, só uma thread reconstrói.
+    """
+    lock = threading.Lock()
+    cached = (_MISSING, None)
+
+    def get():
+        nonlocal cached
+        current = key()
+        cached_key, value = cached
+        if cached_key is not _MISSING and cached_key == current:
+            return value
+        with lock:
+            cached_key, value = cached
+            if cached_key is _MISSING or cached_key != current:
+                value = builder(current)
+                cached = (current, value)
+        return value
+
+    return get
+
+
+def last_modified():
+    """Momento da última troca de versão, ou None se o dataset nunca foi versionado."""
+    try:
+        st = os.stat(_version_path())
+    except FileNotFoundError:
+        return None
+    return datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+
+
+def bump_version():
+    """Gera uma nova versão do dataset, invalidando índices e caches derivados."""
+    path = _version_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    version = uuid.uuid4().hex
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(version)
+    os.replace(tmp_path, path)
+    return version
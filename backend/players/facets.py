@@ -0,0 +1,104 @@
+import numpy as np
+from django.db.models import Count, F
+from rest_framework.exceptions import ValidationError
+
+from .filters import POSITION_FILTER, filter_players
+from .index import CATEGORICAL_COLUMNS
+from .models import PlayerPosition
+
+# Contagens por faceta para o endpoint de filtro.
+#
+# Cada faceta é calculada com todos os critérios atuais menos o seu próprio
+# filtro, como nas buscas facetadas: com league_name=Premier, a faceta de ligas
+# continua mostrando as outras ligas (e quantos jogadores cada uma teria). Com
+# o índice em memória, cada faceta é uma máscara + np.bincount; sem ele, uma
+# consulta agregada (GROUP BY) por faceta.
+
+FACETS = ('league_name', 'club_name', 'nationality', POSITION_FILTER, 'overall')
+# Critérios ignorados no cálculo de cada faceta
+FACET_FILTERS = {
+    'league_name': ('league_name',),
+    'club_name': ('club_name',),
+    'nationality': ('nationality',),
+    POSITION_FILTER: (POSITION_FILTER,),
+    'overall': ('overall_min', 'overall_max'),
+}
+OVERALL_BUCKET = 5
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+
+def parse_facets(params):
+    """Facetas pedidas em ?facets= e o limite de valores por faceta (?facet_limit=)."""
+    names = [name.strip() for name in params.get('facets', '').split(',') if name.strip()]
+    unknown = sorted(set(names) - set(FACETS))
+    if unknown:
+        raise ValidationError({'facets': f"Unknown facets: {', '.join(unknown)}. Use {', '.join(FACETS)}"})
+    try:
+        limit = int(params.get('facet_limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValidationError({'facet_limit': 'facet_limit must be an integer'})
+    return list(dict.fromkeys(names)), min(max(limit, 1), MAX_LIMIT)
+
+
+def without(criteria, facet):
+    return {name: value for name, value in criteria.items() if name not in FACET_FILTERS[facet]}
+
+
+def value_counts(pairs, limit):
+    pairs = sorted(((value, int(count)) for value, count in pairs if value and count), key=lambda p: (-p[1], p[0]))
+    return [{'value': value, 'count': count} for value, count in pairs[:limit]]
+
+
+def overall_buckets(pairs):
+    return [
+        {
+            'value': f'{bucket * OVERALL_BUCKET}-{bucket * OVERALL_BUCKET + OVERALL_BUCKET - 1}',
+            'min': bucket * OVERALL_BUCKET,
+            'max': bucket * OVERALL_BUCKET + OVERALL_BUCKET - 1,
+            'count': int(count),
+        }
+        for bucket, count in sorted(pairs, reverse=True)
+        if count
+    ]
+
+
+def index_facets(index, criteria, facets, limit):
+    result = {}
+    for facet in facets:
+        mask = index.mask(without(criteria, facet))
+        if facet in CATEGORICAL_COLUMNS:
+            counts = np.bincount(index.codes[facet][mask], minlength=len(index.vocab[facet]))
+            result[facet] = value_counts(zip(index.vocab[facet], counts), limit)
+        elif facet == POSITION_FILTER:
+            selected = index.position_mask[mask]
+            counts = (
+                np.count_nonzero(selected & np.uint64(1 << i)) for i in range(len(index.position_vocab))
+            )
+            result[facet] = value_counts(zip(index.position_vocab, counts), limit)
+        else:
+            counts = np.bincount(index.overall[mask] // OVERALL_BUCKET)
+            result[facet] = overall_buckets(enumerate(counts))
+    return result
+
+
+def db_facets(queryset, criteria, facets, limit):
+    result = {}
+    for facet in facets:
+        filtered = filter_players(queryset, without(criteria, facet))
+        if facet in CATEGORICAL_COLUMNS:
+            rows = filtered.exclude(**{facet: ''}).values_list(facet).annotate(
+                count=Count('pk')
+            ).order_by('-count', facet)[:limit]
+            result[facet] = value_counts(rows, limit)
+        elif facet == POSITION_FILTER:
+            rows = PlayerPosition.objects.filter(player__in=filtered).values_list('position').annotate(
+                count=Count('pk')
+            ).order_by('-count', 'position')[:limit]
+            result[facet] = value_counts(rows, limit)
+        else:
+            rows = filtered.annotate(bucket=F('overall') / OVERALL_BUCKET).values_list('bucket').annotate(
+                count=Count('pk')
+            ).order_by('bucket')
+            result[facet] = overall_buckets(rows)
+    return result
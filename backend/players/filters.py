@@ -0,0 +1,102 @@
+# Filtros compartilhados entre as views de jogadores.
+#
+# Os parâmetros da query string são convertidos num dicionário de critérios,
+# que pode ser aplicado tanto a um queryset quanto ao índice em memória.
+#
+# As buscas textuais usam __icontains de propósito: no Postgres o lookup gera
+# UPPER("coluna"::text) LIKE ..., a mesma expressão dos índices GIN de
+# trigramas definidos em Player.Meta.indexes.
+#
+# Posições são comparadas de forma exata ("CB" não casa com "LCB") através da
+# tabela normalizada PlayerPosition. Aceita lista separada por vírgula.
+
+import math
+
+from django.db.models import Exists, OuterRef, Q
+from rest_framework.exceptions import ValidationError
+
+from .models import PlayerPosition, split_positions
+
+TEXT_FILTERS = (
+    'short_name',
+    'long_name',
+    'club_name',
+    'league_name',
+    'nationality',
+)
+POSITION_FILTER = 'player_positions'
+
+RANGE_FILTERS = {
+    'age_min': ('age', 'gte'),
+    'age_max': ('age', 'lte'),
+    'overall_min': ('overall', 'gte'),
+    'overall_max': ('overall', 'lte'),
+    'value_min': ('value_eur', 'gte'),
+    'value_max': ('value_eur', 'lte'),
+}
+# Valores em euros aceitam notação decimal e científica (ex.: 1.5e7); ao
+# contrário dos demais limites, um valor inválido é erro em vez de ignorado
+DECIMAL_FILTERS = ('value_min', 'value_max')
+
+
+def parse_criteria(params, names=None):
+    """Extrai os critérios de filtro válidos de ``params`` (ex.: request.query_params)."""
+    criteria = {}
+    for name in TEXT_FILTERS:
+        if names is not None and name not in names:
+            continue
+        value = params.get(name)
+        if value:
+            criteria[name] = value
+
+    if names is None or POSITION_FILTER in names:
+        positions = split_positions(params.get(POSITION_FILTER))
+        if positions:
+            criteria[POSITION_FILTER] = positions
+
+    for name in RANGE_FILTERS:
+        if names is not None and name not in names:
+            continue
+        value = params.get(name)
+        if not value:
+            continue
+        if name in DECIMAL_FILTERS:
+            try:
+                number = float(value)
+            except ValueError:
+                number = math.nan
+            if not math.isfinite(number):
+                raise ValidationError({name: f'{name} must be a number'})
+            criteria[name] = number
+            continue
+        try:
+            criteria[name] = int(value)
+        except ValueError:
+            pass
+
+    return criteria
+
+
+def search_players(queryset, query):
+    return queryset.filter(Q(short_name__icontains=query) | Q(long_name__icontains=query))
+
+
+def with_positions(queryset, positions):
+    return queryset.filter(
+        Exists(PlayerPosition.objects.filter(player=OuterRef('pk'), position__in=positions))
+    )
+
+
+def filter_players(queryset, criteria):
+    for name in TEXT_FILTERS:
+        if name in criteria:
+            queryset = queryset.filter(**{f'{name}__icontains': criteria[name]})
+
+    if POSITION_FILTER in criteria:
+        queryset = with_positions(queryset, criteria[POSITION_FILTER])
+
+    for name, (field, lookup) in RANGE_FILTERS.items():
+        if name in criteria:
+            queryset = queryset.filter(**{f'{field}__{lookup}': criteria[name]})
+
+    return queryset
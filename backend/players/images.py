@@ -0,0 +1,410 @@
+import hashlib
+import io
+import mimetypes
+import mmap
+import os
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import dataset
+
+# Serviço das fotos dos jogadores sem consultar o banco.
+#
+# O caminho sai direto do sofifa_id (MEDIA_ROOT/players_images/<id>.png, como
+# grava o download_all_images). Arquivos com nomes antigos são achados por um
+# mapa id -> arquivo montado a partir do diretório, refeito a cada versão do
+# dataset ou das imagens.
+#
+# Versões reduzidas em WebP/AVIF ficam em players_images/derivatives/<tamanho>/
+# e são escolhidas pelo parâmetro size= e pelo cabeçalho Accept.
+#
+# Opcionalmente, cada variante ("png" para as originais, "webp-64" etc.) pode
+# ser empacotada pelo pack_player_images num único arquivo + índice de offsets
+# por sofifa_id, lido via mmap: nenhum open() por foto. Os comandos que
+# regravam fotos removem os pacotes afetados (drop_packs), que voltam a ser
+# servidas dos arquivos até o próximo pack_player_images.
+#
+# Os comandos que só mexem nos arquivos de imagem trocam a versão das imagens
+# (touch_images), não a do dataset: os caches de JSON e os índices em memória
+# dos jogadores continuam válidos.
+
+MEDIA_SUBDIR = 'players_images'
+DERIVATIVES_SUBDIR = 'derivatives'
+PACKS_SUBDIR = 'packs'
+ORIGINAL_VARIANT = 'png'
+IMAGES_VERSION_FILE = '.version'
+# Formatos em ordem de preferência: (extensão, content type, opções do Pillow)
+DERIVATIVE_FORMATS = (
+    ('avif', 'image/avif', {'quality': 60}),
+    ('webp', 'image/webp', {'quality': 80, 'method': 6}),
+)
+
+_packs = {}
+_images_version = (None, '0')
+
+
+def images_dir():
+    return os.path.join(settings.MEDIA_ROOT, MEDIA_SUBDIR)
+
+
+def images_version():
+    """Versão dos arquivos de imagem, guardada num arquivo-marcador em players_images/."""
+    global _images_version
+
+    path = os.path.join(images_dir(), IMAGES_VERSION_FILE)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return '0'
+
+    key = (path, st.st_ino, st.st_mtime_ns)
+    cached_key, version = _images_version
+    if cached_key != key:
+        with open(path) as f:
+            version = f.read().strip() or '0'
+        _images_version = (key, version)
+    return version
+
+
+def touch_images(root=None):
+    """Gera uma nova versão das imagens (mapa de arquivos antigos, pacotes e ETags dos sprites)."""
+    root = root or images_dir()
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, IMAGES_VERSION_FILE)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(tmp_path, path)
+
+
+def _images_key(path):
+    return dataset.current_version(), images_version(), path
+
+
+def _scan_legacy_paths(key):
+    """Mapa id -> arquivo dos nomes antigos (ex.: 158023_face.png) do diretório de imagens."""
+    paths = {}
+    try:
+        entries = sorted(os.scandir(key[2]), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        prefix = entry.name.split('.', 1)[0].split('_', 1)[0]
+        if prefix.isdigit() and entry.is_file():
+            paths.setdefault(int(prefix), entry.path)
+    return paths
+
+
+_legacy_path_map = dataset.versioned(_scan_legacy_paths, key=lambda: _images_key(images_dir()))
+
+
+def image_path(sofifa_id):
+    """Caminho absoluto da foto do jogador, ou None se não existir."""
+    path = os.path.join(images_dir(), f'{sofifa_id}.png')
+    if os.path.exists(path):
+        return path
+    return _legacy_path_map().get(sofifa_id)
+
+
+def derivative_path(sofifa_id, size, extension, root=None):
+    root = root or images_dir()
+    return os.path.join(root, DERIVATIVES_SUBDIR, str(size), f'{sofifa_id}.{extension}')
+
+
+def generate_derivatives(sofifa_id, source, sizes, extensions, root, force=False):
+    """Gera as versões reduzidas de uma foto. Roda em processos separados."""
+    from PIL import Image
+
+    options = {extension: opts for extension, _, opts in DERIVATIVE_FORMATS}
+    source_mtime = os.stat(source).st_mtime
+    created = 0
+
+    with Image.open(source) as original:
+        original = original.convert('RGBA')
+        for size in sizes:
+            image = None
+            for extension in extensions:
+                target = derivative_path(sofifa_id, size, extension, root)
+                if not force and os.path.exists(target) and os.stat(target).st_mtime >= source_mtime:
+                    continue
+                if image is None:
+                    image = original.copy()
+                    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_target = f'{target}.tmp'
+                image.save(tmp_target, format=extension.upper(), **options[extension])
+                os.replace(tmp_target, target)
+                created += 1
+    return created
+
+
+def derivative_extensions(avif=None):
+    from PIL import features
+
+    if avif is None:
+        avif = settings.PLAYERS_IMAGE_AVIF
+    extensions = ['webp']
+    if avif and features.check('avif'):
+        extensions.append('avif')
+    return extensions
+
+
+def pack_paths(variant, root=None):
+    root = os.path.join(root or images_dir(), PACKS_SUBDIR)
+    return os.path.join(root, f'{variant}.bin'), os.path.join(root, f'{variant}.idx.npy')
+
+
+def write_pack(variant, sources, root=None):
+    """Grava o pacote de uma variante a partir de (sofifa_id, caminho) ordenáveis."""
+    blob_path, index_path = pack_paths(variant, root)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+    sources = sorted(sources)
+    index = np.zeros(len(sources), dtype=[('sofifa_id', 'i8'), ('offset', 'i8'), ('length', 'i8')])
+    offset = 0
+    with open(f'{blob_path}.tmp', 'wb') as blob:
+        for i, (sofifa_id, path) in enumerate(sources):
+            with open(path, 'rb') as f:
+                data = f.read()
+            blob.write(data)
+            index[i] = (sofifa_id, offset, len(data))
+            offset += len(data)
+
+    with open(f'{index_path}.tmp', 'wb') as f:
+        np.save(f, index)
+    os.replace(f'{index_path}.tmp', index_path)
+    os.replace(f'{blob_path}.tmp', blob_path)
+    return len(sources), offset
+
+
+def drop_packs(variants, root=None):
+    """Remove os pacotes das variantes (ex.: depois de regravar as fotos avulsas).
+
+    Um pacote não sabe quando as fotos de origem mudam; sem ele, as fotos
+    voltam a ser lidas dos arquivos até o próximo pack_player_images.
+    Retorna as variantes removidas.
+    """
+    dropped = []
+    for variant in variants:
+        removed = False
+        for path in pack_paths(variant, root):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+        if removed:
+            dropped.append(variant)
+    return dropped
+
+
+class PackedImages:
+    """Pacote de fotos mapeado em memória.
+
+    get() devolve uma fatia do mmap, sem ler o arquivo; a resposta HTTP ainda
+    copia os bytes para o corpo.
+    """
+
+    def __init__(self, blob_path, index_path):
+        index = np.load(index_path)
+        self.ids = index['sofifa_id']
+        self.offsets = index['offset']
+        self.lengths = index['length']
+        stat = os.stat(blob_path)
+        self.mtime = stat.st_mtime
+        self.mtime_ns = stat.st_mtime_ns
+
+        with open(blob_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+
+    def position(self, sofifa_id):
+        i = int(np.searchsorted(self.ids, sofifa_id))
+        if i < len(self.ids) and self.ids[i] == sofifa_id:
+            return i
+        return None
+
+    def __contains__(self, sofifa_id):
+        return self.position(sofifa_id) is not None
+
+    def get(self, sofifa_id):
+        i = self.position(sofifa_id)
+        if i is None:
+            return None
+        start = int(self.offsets[i])
+        return self._view[start:start + int(self.lengths[i])]
+
+
+def _open_pack(key):
+    """Abre o pacote (arquivo de dados e índice), ou None se não existir."""
+    blob_path, index_path = key[2]
+    if os.path.exists(blob_path) and os.path.exists(index_path):
+        return PackedImages(blob_path, index_path)
+    return None
+
+
+def packed_images(variant):
+    """Pacote da variante, reaberto quando o dataset ou as imagens mudam; None se não existir."""
+    getter = _packs.get(variant)
+    if getter is None:
+        getter = _packs.setdefault(variant, dataset.versioned(
+            _open_pack, key=lambda: _images_key(pack_paths(variant)),
+        ))
+    return getter()
+
+
+class PackedImage:
+    def __init__(self, store, sofifa_id):
+        self.store = store
+        self.sofifa_id = sofifa_id
+
+
+def requested_size(request):
+    try:
+        size = int(request.GET['size'])
+    except (KeyError, ValueError):
+        size = None
+
+    sizes = sorted(settings.PLAYERS_IMAGE_SIZES)
+    if size is None or size <= 0 or size > sizes[-1]:
+        return sizes[-1]
+    return next(candidate for candidate in sizes if candidate >= size)
+
+
+def find_image(sofifa_id, size, accept):
+    """Melhor fonte da foto: (PackedImage ou caminho, content type), ou None.
+
+    Percorre os formatos aceitos em ordem de preferência, primeiro no pacote e
+    depois no arquivo avulso, e termina na original em PNG.
+    """
+    for extension, content_type, _ in DERIVATIVE_FORMATS:
+        if content_type not in accept:
+            continue
+        store = packed_images(f'{extension}-{size}')
+        if store is not None and sofifa_id in store:
+            return PackedImage(store, sofifa_id), content_type
+        path = derivative_path(sofifa_id, size, extension)
+        if os.path.exists(path):
+            return path, content_type
+
+    store = packed_images(ORIGINAL_VARIANT)
+    if store is not None and sofifa_id in store:
+        return PackedImage(store, sofifa_id), 'image/png'
+    path = image_path(sofifa_id)
+    if path is None:
+        return None
+    return path, None
+
+
+def file_etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    return etag in (candidate.strip() for candidate in header.split(','))
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def with_validators(request, etag, mtime, build_response):
+    if not_modified(request, etag, mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = build_response()
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    response['Cache-Control'] = f'public, max-age={settings.PLAYERS_IMAGE_MAX_AGE}'
+    return response
+
+
+def serve_file(request, path, content_type=None):
+    """Responde com o arquivo, validadores HTTP e, se configurado, offload ao servidor web."""
+    stat = os.stat(path)
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return with_validators(
+        request, file_etag(stat), stat.st_mtime, lambda: _file_response(path, content_type)
+    )
+
+
+def serve_packed(request, image, content_type):
+    data = image.store.get(image.sofifa_id)
+    etag = f'"{image.store.mtime_ns:x}-{image.sofifa_id:x}-{len(data):x}"'
+    return with_validators(
+        request, etag, image.store.mtime, lambda: HttpResponse(data, content_type=content_type)
+    )
+
+
+def serve_image(request, source, content_type=None):
+    if isinstance(source, PackedImage):
+        return serve_packed(request, source, content_type)
+    return serve_file(request, source, content_type)
+
+
+def _file_response(path, content_type):
+    sendfile = settings.PLAYERS_IMAGE_SENDFILE
+    if sendfile == 'x-accel-redirect':
+        # O nginx entrega o arquivo a partir de uma location "internal"
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PLAYERS_IMAGE_ACCEL_PREFIX.rstrip('/') + '/' + relative
+        return response
+    if sendfile == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+    return FileResponse(open(path, 'rb'), content_type=content_type)
+
+
+def read_image(source):
+    if isinstance(source, PackedImage):
+        return io.BytesIO(source.store.get(source.sofifa_id))
+    return open(source, 'rb')
+
+
+def sprite_etag(ids, size, columns, image_format):
+    key = f'{ids}:{size}:{columns}:{image_format}'.encode()
+    version = f'{dataset.current_version()}-{images_version()}'
+    return f'"sprite-{version}-{hashlib.sha1(key).hexdigest()[:16]}"'
+
+
+def render_sprite(ids, size, columns, image_format):
+    """Monta uma grade com as fotos dos ids (na ordem); fotos ausentes ficam vazias."""
+    from PIL import Image
+
+    rows = max((len(ids) + columns - 1) // columns, 1)
+    sprite = Image.new('RGBA', (columns * size, rows * size), (0, 0, 0, 0))
+    accept = ','.join(content_type for _, content_type, _ in DERIVATIVE_FORMATS)
+
+    for i, sofifa_id in enumerate(ids):
+        found = find_image(sofifa_id, size, accept)
+        if found is None:
+            continue
+        with read_image(found[0]) as f, Image.open(f) as face:
+            face = face.convert('RGBA')
+            face.thumbnail((size, size), Image.Resampling.LANCZOS)
+            x = (i % columns) * size + (size - face.width) // 2
+            y = (i // columns) * size + (size - face.height) // 2
+            sprite.paste(face, (x, y), face)
+
+    output = io.BytesIO()
+    if image_format == 'webp':
+        sprite.save(output, format='WEBP', quality=80)
+    else:
+        sprite.save(output, format='PNG', optimize=True)
+    return output.getvalue()
+
@@ -0,0 +1,192 @@
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError
+
+from . import dataset
+from .filters import POSITION_FILTER, RANGE_FILTERS
+from .models import Player, split_positions
+from .serializers import player_data, player_values
+
+logger = logging.getLogger(__name__)
+
+# Índice colunar em memória dos jogadores.
+#
+# A tabela inteira do FIFA 21 tem ~19k linhas, então cabe folgada em arrays
+# NumPy. As colunas numéricas ficam em arrays, as categóricas são codificadas
+# por dicionário e as posições viram uma máscara de bits. As linhas já
+# serializadas são guardadas na ordem (-overall, sofifa_id), de modo que o
+# resultado de qualquer máscara sai ordenado sem nenhum sort extra.
+
+CATEGORICAL_COLUMNS = ('club_name', 'league_name', 'nationality')
+NAME_COLUMNS = ('short_name', 'long_name')
+METRICS = ('overall', 'potential', 'value_eur', 'age')
+
+
+def sort_key(overall, sofifa_id):
+    # Chave crescente equivalente à ordem (-overall, sofifa_id)
+    return (-np.int64(overall) << 32) + np.int64(sofifa_id)
+
+
+class IndexResult:
+    """Sequência preguiçosa de linhas serializadas (compatível com o Paginator)."""
+
+    def __init__(self, index, positions):
+        self.index = index
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, item):
+        rows = self.index.rows
+        if isinstance(item, slice):
+            return [rows[i] for i in self.positions[item]]
+        return rows[self.positions[item]]
+
+    def __iter__(self):
+        rows = self.index.rows
+        return (rows[i] for i in self.positions)
+
+    def after(self, overall, sofifa_id):
+        """Linhas depois de (overall, sofifa_id) na ordem (-overall, sofifa_id)."""
+        keys = self.index.sort_key[self.positions]
+        start = np.searchsorted(keys, sort_key(overall, sofifa_id), side='right')
+        return IndexResult(self.index, self.positions[start:])
+
+
+class PlayerIndex:
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        size = len(rows)
+
+        self.sofifa_id = np.fromiter((r['sofifa_id'] for r in rows), np.int64, size)
+        self.age = np.fromiter((r['age'] for r in rows), np.int32, size)
+        self.overall = np.fromiter((r['overall'] for r in rows), np.int32, size)
+        self.potential = np.fromiter((r['potential'] for r in rows), np.int32, size)
+        self.value_eur = np.fromiter((r['value_eur'] or 0 for r in rows), np.float64, size)
+
+        self.names = {
+            column: np.array([(r[column] or '').upper() for r in rows], dtype=str)
+            for column in NAME_COLUMNS
+        }
+
+        self.codes = {}
+        self.vocab = {}
+        for column in CATEGORICAL_COLUMNS:
+            vocab, codes = np.unique(
+                np.array([r[column] or '' for r in rows], dtype=object),
+                return_inverse=True,
+            )
+            self.vocab[column] = list(vocab)
+            self.codes[column] = codes.astype(np.int32)
+        self._vocab_upper = {
+            column: [value.upper() for value in vocab]
+            for column, vocab in self.vocab.items()
+        }
+
+        player_positions = [split_positions(r['player_positions']) for r in rows]
+        # Até 64 posições distintas (o FIFA usa 15)
+        self.position_vocab = sorted({p for positions in player_positions for p in positions})
+        bits = {p: 1 << i for i, p in enumerate(self.position_vocab)}
+        self.position_mask = np.fromiter(
+            (sum(bits[p] for p in positions) for positions in player_positions),
+            np.uint64,
+            size,
+        )
+
+        self.sort_key = sort_key(self.overall, self.sofifa_id)
+        self.row_by_id = {int(sofifa_id): i for i, sofifa_id in enumerate(self.sofifa_id)}
+
+    @classmethod
+    def build(cls, version):
+        queryset = Player.objects.order_by('-overall', 'sofifa_id')
+        rows = [player_data(row) for row in player_values(queryset)]
+        return cls(version, rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _category_mask(self, column, value):
+        needle = value.upper()
+        lookup = np.fromiter(
+            (needle in candidate for candidate in self._vocab_upper[column]),
+            bool,
+            len(self._vocab_upper[column]),
+        )
+        return lookup[self.codes[column]]
+
+    def position_bits(self, positions):
+        bits = 0
+        for i, position in enumerate(self.position_vocab):
+            if position in positions:
+                bits |= 1 << i
+        return np.uint64(bits)
+
+    def mask(self, criteria):
+        mask = np.ones(len(self.rows), dtype=bool)
+
+        for column in NAME_COLUMNS:
+            if column in criteria:
+                mask &= np.char.find(self.names[column], criteria[column].upper()) >= 0
+        for column in CATEGORICAL_COLUMNS:
+            if column in criteria:
+                mask &= self._category_mask(column, criteria[column])
+        if POSITION_FILTER in criteria:
+            mask &= (self.position_mask & self.position_bits(criteria[POSITION_FILTER])) != 0
+
+        for name, (field, lookup) in RANGE_FILTERS.items():
+            if name in criteria:
+                column = getattr(self, field)
+                if lookup == 'gte':
+                    mask &= column >= criteria[name]
+                else:
+                    mask &= column <= criteria[name]
+
+        return mask
+
+    def filter(self, criteria):
+        return IndexResult(self, np.flatnonzero(self.mask(criteria)))
+
+    def top_k(self, criteria, k, metric='overall'):
+        positions = np.flatnonzero(self.mask(criteria))
+        if k <= 0:
+            return IndexResult(self, positions[:0])
+        if metric == 'overall' or len(positions) == 0:
+            # As linhas já estão na ordem (-overall, sofifa_id).
+            return IndexResult(self, positions[:k])
+
+        values = getattr(self, metric)[positions]
+        if k < len(positions):
+            best = np.argpartition(-values, k - 1)[:k]
+            positions, values = positions[best], values[best]
+        order = np.lexsort((self.sofifa_id[positions], -values))
+        return IndexResult(self, positions[order])
+
+
+_index = dataset.versioned(PlayerIndex.build)
+
+
+def get_player_index():
+    """Retorna o índice atualizado, reconstruindo-o se o dataset mudou.
+
+    Retorna ``None`` quando o índice está desabilitado (PLAYERS_INDEX_ENABLED),
+    caso em que as views voltam a consultar o banco.
+    """
+    if not settings.PLAYERS_INDEX_ENABLED:
+        return None
+    return _index()
+
+
+def warm_up():
+    """Constrói o índice na subida do processo, sem derrubá-la se o banco não estiver pronto."""
+    try:
+        index = get_player_index()
+    except DatabaseError as exc:
+        logger.warning("Índice de jogadores não pôde ser construído: %s", exc)
+        return None
+    if index is not None:
+        logger.info("Índice de jogadores construído com %d jogadores", len(index))
+    return index
@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from players.models import Player
+from players.renderers import ORJSONRenderer
+from players.serializers import PlayerSerializer, player_data, player_values
+
+
+class Command(BaseCommand):
+    help = "Compara o PlayerSerializer + JSONRenderer com o caminho rápido (.values() + orjson)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100, help="Jogadores por página (padrão: 100)")
+        parser.add_argument("--iterations", type=int, default=200, help="Repetições de cada caminho (padrão: 200)")
+
+    def handle(self, *args, **options):
+        rows = max(options["rows"], 1)
+        iterations = max(options["iterations"], 1)
+        queryset = Player.objects.order_by("-overall", "sofifa_id")[:rows]
+
+        def serializer_page():
+            return JSONRenderer().render(PlayerSerializer(queryset, many=True).data)
+
+        def fast_page():
+            return ORJSONRenderer().render([player_data(row) for row in player_values(queryset)])
+
+        if serializer_page() != fast_page():
+            raise CommandError("Os dois caminhos geraram JSON diferente.")
+
+        timings = {}
+        for name, render in (("PlayerSerializer", serializer_page), ("values + orjson", fast_page)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            timings[name] = time.perf_counter() - started
+            rate = iterations * rows / timings[name]
+            self.stdout.write(f"{name:>16}: {timings[name] / iterations * 1000:.2f} ms/página, {rate:,.0f} jogadores/s")
+
+        speedup = timings["PlayerSerializer"] / timings["values + orjson"]
+        self.stdout.write(self.style.SUCCESS(f"JSON idêntico; caminho rápido {speedup:.1f}x mais rápido."))
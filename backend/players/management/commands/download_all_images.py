@@ -1,53 +1,267 @@
+import asyncio
+import json
+import multiprocessing
 import os
-import requests
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import httpx
 from django.core.management.base import BaseCommand
-from django.core.files.base import ContentFile
+from players import dataset
+from players.images import ORIGINAL_VARIANT, derivative_extensions, drop_packs, generate_derivatives, touch_images
 from players.models import Player
 from django.conf import settings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+MEDIA_SUBDIR = "players_images"
+DEFAULT_BASE_URL = "https://cdn.sofifa.net/players"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def face_url(sofifa_id, base_url=DEFAULT_BASE_URL):
+    sofifa_id_str = str(sofifa_id).zfill(6)
+    year = sofifa_id_str[:3]
+    rest = sofifa_id_str[3:]
+    return f"{base_url.rstrip('/')}/{year}/{rest}/21_120.png"
+
+
+def image_name(sofifa_id):
+    return f"{MEDIA_SUBDIR}/{sofifa_id}.png"
+
+
+class Checkpoint:
+    """Estado persistido entre execuções: ids já processados e validadores HTTP."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.validators = {}
+        self.finished = True
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.validators = data.get("validators", {})
+            self.finished = data.get("finished", True)
+
+    def start(self, restart=False):
+        # Uma execução interrompida continua de onde parou
+        if restart or self.finished:
+            self.done = set()
+        self.finished = False
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "finished": self.finished,
+                "done": sorted(self.done),
+                "validators": self.validators,
+            }, f)
+        os.replace(tmp_path, self.path)
+
 
 class Command(BaseCommand):
-    help = "Baixa imagens remotas e atualiza real_face_local no ImageField com paralelismo"
+    help = "Baixa imagens remotas e atualiza real_face_local com downloads assíncronos e retomáveis"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=20, help="Downloads simultâneos (padrão: 20)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Jogadores por bulk_update (padrão: 500)")
+        parser.add_argument("--max-retries", type=int, default=5, help="Tentativas em 429/5xx (padrão: 5)")
+        parser.add_argument(
+            "--base-url",
+            help="Base das imagens (ex.: servidor local de testes); por padrão usa real_face ou o CDN do sofifa",
+        )
+        parser.add_argument("--checkpoint", help="Arquivo de checkpoint (padrão: MEDIA_ROOT/players_images/.checkpoint.json)")
+        parser.add_argument("--restart", action="store_true", help="Ignora o progresso salvo e recomeça do zero")
+        parser.add_argument(
+            "--derivatives",
+            action="store_true",
+            help="Gera as versões reduzidas (WebP/AVIF) de cada imagem baixada, em paralelo",
+        )
+
+    def handle(self, *args, **options):
+        media_dir = os.path.join(settings.MEDIA_ROOT, MEDIA_SUBDIR)
+        os.makedirs(media_dir, exist_ok=True)
+
+        checkpoint = Checkpoint(options["checkpoint"] or os.path.join(media_dir, ".checkpoint.json"))
+        checkpoint.start(restart=options["restart"])
+        checkpoint.save()
+
+        jobs = []
+        # Ids sem real_face, que recebem a URL do CDN; com --base-url (servidor
+        # de testes) a URL canônica nunca é trocada
+        missing_face = set()
+        for sofifa_id, real_face in Player.objects.values_list("sofifa_id", "real_face").order_by("sofifa_id"):
+            if sofifa_id in checkpoint.done:
+                continue
+            if options["base_url"]:
+                url = face_url(sofifa_id, options["base_url"])
+            else:
+                url = real_face or face_url(sofifa_id)
+                if not real_face:
+                    missing_face.add(sofifa_id)
+            path = os.path.join(media_dir, f"{sofifa_id}.png")
+            validators = checkpoint.validators.get(str(sofifa_id)) if os.path.exists(path) else None
+            jobs.append((sofifa_id, url, path, validators))
+
+        self.stdout.write(f"{len(jobs)} imagens a verificar ({len(checkpoint.done)} já processadas).")
+
+        # Redimensionamento em processos separados, enquanto os downloads seguem.
+        # "spawn" evita fazer fork com a thread de downloads rodando.
+        executor = None
+        if options["derivatives"]:
+            executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        derivatives = []
+        extensions = derivative_extensions() if executor else None
+
+        # Os downloads rodam num event loop em outra thread; o ORM fica nesta
+        results = queue.Queue()
+        worker = threading.Thread(target=self.run_downloads, args=(jobs, results, options), daemon=True)
+        worker.start()
 
-    def handle(self, *args, **kwargs):
-        players = Player.objects.all()
         count_updated = 0
         count_skipped = 0
+        pending = []
+        while True:
+            result = results.get()
+            if result is None:
+                break
+            if isinstance(result, BaseException):
+                self.flush(pending, checkpoint)
+                raise result
 
-        def process_player(player):
-            result = {"id": player.sofifa_id, "status": "skipped"}
-            if not player.real_face:
-                sofifa_id_str = str(player.sofifa_id).zfill(6)
-                year = sofifa_id_str[:3]
-                rest = sofifa_id_str[3:]
-                player.real_face = f"https://cdn.sofifa.net/players/{year}/{rest}/21_120.png"
-                player.save()
+            sofifa_id, url, status, validators = result
+            if status in ("updated", "not_modified"):
+                pending.append(Player(
+                    sofifa_id=sofifa_id,
+                    real_face=url if sofifa_id in missing_face else None,
+                    real_face_local=image_name(sofifa_id),
+                ))
+                if validators:
+                    checkpoint.validators[str(sofifa_id)] = validators
+            if status == "updated":
+                count_updated += 1
+                self.stdout.write(f"[{sofifa_id}] Imagem atualizada.")
+                if executor:
+                    derivatives.append(executor.submit(
+                        generate_derivatives,
+                        sofifa_id,
+                        os.path.join(media_dir, f"{sofifa_id}.png"),
+                        settings.PLAYERS_IMAGE_SIZES,
+                        extensions,
+                        media_dir,
+                        True,
+                    ))
+            else:
+                count_skipped += 1
+                self.stdout.write(f"[{sofifa_id}] Pulado ({status}).")
 
-            try:
-                resp = requests.get(player.real_face, timeout=10)
-                if resp.status_code == 200:
-                    filename = f"{player.sofifa_id}.png"
-                    player.real_face_local.save(filename, ContentFile(resp.content), save=True)
-                    result["status"] = "updated"
-                else:
-                    result["status"] = f"HTTP {resp.status_code}"
-            except Exception as e:
-                result["status"] = f"error: {e}"
-            return result
-
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = {executor.submit(process_player, player): player for player in players}
-            for future in as_completed(futures):
-                result = future.result()
-                sofifa_id = result["id"]
-                status = result["status"]
-                if status == "updated":
-                    count_updated += 1
-                    self.stdout.write(f"[{sofifa_id}] Imagem atualizada.")
-                else:
-                    count_skipped += 1
-                    self.stdout.write(f"[{sofifa_id}] Pulado ({status}).")
+            checkpoint.done.add(sofifa_id)
+            if len(pending) >= options["batch_size"]:
+                self.flush(pending, checkpoint)
+
+        self.flush(pending, checkpoint)
+        worker.join()
+
+        count_derivatives = 0
+        if executor:
+            for future in derivatives:
+                try:
+                    count_derivatives += future.result()
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"Falha ao gerar versões reduzidas: {e}"))
+            executor.shutdown()
+            self.stdout.write(f"{count_derivatives} versões reduzidas geradas.")
+
+        checkpoint.finished = True
+        checkpoint.save()
+        if count_updated:
+            # Os pacotes não enxergam as fotos regravadas
+            variants = [ORIGINAL_VARIANT]
+            if count_derivatives:
+                variants += [f"{extension}-{size}" for size in settings.PLAYERS_IMAGE_SIZES for extension in extensions]
+            dropped = drop_packs(variants, media_dir)
+            if dropped:
+                self.stdout.write(f"Pacotes desatualizados removidos: {', '.join(dropped)}. Rode pack_player_images de novo.")
+            touch_images(media_dir)
+            dataset.bump_version()
 
         self.stdout.write(self.style.SUCCESS(
             f"Concluído: {count_updated} imagens atualizadas, {count_skipped} jogadores pulados."
         ))
+
+    def flush(self, pending, checkpoint):
+        if pending:
+            Player.objects.bulk_update(pending, ["real_face_local"])
+            Player.objects.bulk_update([player for player in pending if player.real_face], ["real_face"])
+            pending.clear()
+        # Só marca como feito o que já está gravado no banco
+        checkpoint.save()
+
+    def run_downloads(self, jobs, results, options):
+        try:
+            asyncio.run(self.download_all(jobs, results, options))
+        except BaseException as exc:
+            results.put(exc)
+        finally:
+            results.put(None)
+
+    async def download_all(self, jobs, results, options):
+        concurrency = max(options["concurrency"], 1)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        jobs = iter(jobs)
+
+        async with httpx.AsyncClient(limits=limits, timeout=10, follow_redirects=True) as client:
+            async def worker():
+                for job in jobs:
+                    results.put(await self.download(client, job, options["max_retries"]))
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def download(self, client, job, max_retries):
+        sofifa_id, url, path, validators = job
+        headers = {}
+        if validators:
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        for attempt in range(max_retries + 1):
+            try:
+                resp = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                if attempt == max_retries:
+                    return sofifa_id, url, f"error: {e}", None
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+
+            if resp.status_code in RETRY_STATUSES and attempt < max_retries:
+                await asyncio.sleep(self.backoff(attempt, resp.headers.get("Retry-After")))
+                continue
+            break
+
+        if resp.status_code == 304:
+            return sofifa_id, url, "not_modified", validators
+        if resp.status_code != 200:
+            return sofifa_id, url, f"HTTP {resp.status_code}", None
+
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(resp.content)
+        os.replace(tmp_path, path)
+
+        return sofifa_id, url, "updated", {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+
+    @staticmethod
+    def backoff(attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                pass
+        return min(0.5 * 2 ** attempt, 30)
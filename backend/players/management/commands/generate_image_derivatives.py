@@ -0,0 +1,57 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from players.images import derivative_extensions, drop_packs, generate_derivatives, images_dir, touch_images
+
+def process_source(job):
+    sofifa_id, path, sizes, extensions, root, force = job
+    try:
+        return sofifa_id, generate_derivatives(sofifa_id, path, sizes, extensions, root, force), None
+    except Exception as e:
+        return sofifa_id, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = "Gera versões reduzidas (WebP e, opcionalmente, AVIF) das fotos dos jogadores"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, help="Processos em paralelo (padrão: núcleos da máquina)")
+        parser.add_argument("--sizes", help="Tamanhos em px separados por vírgula (padrão: PLAYERS_IMAGE_SIZES)")
+        parser.add_argument("--avif", action="store_true", help="Gera também AVIF (se o Pillow suportar)")
+        parser.add_argument("--force", action="store_true", help="Regera mesmo as versões já atualizadas")
+
+    def handle(self, *args, **options):
+        root = images_dir()
+        sizes = settings.PLAYERS_IMAGE_SIZES
+        if options["sizes"]:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        extensions = derivative_extensions(avif=options["avif"] or None)
+
+        sources = []
+        if os.path.isdir(root):
+            for entry in os.scandir(root):
+                sofifa_id, extension = os.path.splitext(entry.name)
+                if entry.is_file() and sofifa_id.isdigit() and extension == ".png":
+                    sources.append((int(sofifa_id), entry.path))
+
+        created = 0
+        failed = 0
+        jobs = [(sofifa_id, path, sizes, extensions, root, options["force"]) for sofifa_id, path in sources]
+        with ProcessPoolExecutor(max_workers=options["workers"]) as executor:
+            for sofifa_id, count, error in executor.map(process_source, jobs, chunksize=32):
+                created += count
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f"[{sofifa_id}] Falha: {error}"))
+
+        # Só os arquivos de imagem mudaram: a versão do dataset fica como está
+        if created:
+            dropped = drop_packs([f"{extension}-{size}" for size in sizes for extension in extensions], root)
+            if dropped:
+                self.stdout.write(f"Pacotes desatualizados removidos: {', '.join(dropped)}. Rode pack_player_images de novo.")
+            touch_images(root)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Concluído: {len(sources)} fotos, {created} versões geradas ({', '.join(extensions)}), {failed} falhas."
+        ))
@@ -1,47 +1,171 @@
 import csv
+import hashlib
+import time
+from itertools import islice
 from django.core.management.base import BaseCommand
-from players.models import Player
+from django.db import transaction
+from players import dataset
+from players.models import ImportChangeset, Player, PlayerPosition
+from players.rankings import primary_position, refresh_rankings
+from players.summaries import refresh_summaries
+
+UPDATE_FIELDS = [
+    "player_url",
+    "short_name",
+    "long_name",
+    "age",
+    "club_name",
+    "league_name",
+    "nationality",
+    "player_positions",
+    "overall",
+    "potential",
+    "value_eur",
+    "real_face_local",
+    "primary_position",
+]
+
+# Colunas vindas do CSV que entram no content_hash
+HASH_FIELDS = [field for field in UPDATE_FIELDS if field not in ("real_face_local", "primary_position")]
+
+
+def content_hash(player):
+    values = "\x1f".join(repr(getattr(player, field)) for field in HASH_FIELDS)
+    return hashlib.sha1(values.encode()).hexdigest()
+
+
+def build_player(row):
+    """Converte uma linha do CSV num Player (levanta ValueError se for inválida)."""
+    sofifa_id = str(int(row["sofifa_id"]))
+
+    folder = sofifa_id[:3]
+    file = sofifa_id[3:]
+    real_face_url = f"https://cdn.sofifa.net/players/{folder}/{file}/21_120.png"
+
+    player = Player(
+        sofifa_id=int(sofifa_id),
+        player_url=row.get("player_url") or "",
+        short_name=row.get("short_name") or "",
+        long_name=row.get("long_name") or "",
+        age=int(row["age"]),
+        club_name=row.get("club_name") or "",
+        league_name=row.get("league_name") or "",
+        nationality=row.get("nationality") or "",
+        player_positions=row.get("player_positions") or "",
+        overall=int(row["overall"]),
+        potential=int(row["potential"]),
+        value_eur=float(row.get("value_eur") or 0),
+        real_face_local=real_face_url,
+        primary_position=primary_position(row.get("player_positions")),
+    )
+    player.content_hash = content_hash(player)
+    return player
+
 
 class Command(BaseCommand):
     help = "Importa jogadores do CSV e popula tabela com sofifa_id (int) + demais campos"
 
     def add_arguments(self, parser):
         parser.add_argument("csv_file", type=str, help="Caminho do arquivo CSV de jogadores")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de linhas gravadas por lote (padrão: 1000)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Grava apenas jogadores novos ou alterados e remove os que saíram do CSV",
+        )
+
+    def read_batches(self, reader, batch_size):
+        while True:
+            rows = list(islice(reader, batch_size))
+            if not rows:
+                return
+
+            # O ON CONFLICT não aceita o mesmo id duas vezes no lote
+            players = {}
+            for row in rows:
+                try:
+                    player = build_player(row)
+                except (KeyError, TypeError, ValueError):
+                    self.stdout.write(self.style.ERROR(f"Linha inválida: {row.get('sofifa_id')}"))
+                    continue
+                players[player.sofifa_id] = player
+            yield list(players.values())
+
+    def write(self, players, update_fields):
+        # Um único INSERT ... ON CONFLICT DO UPDATE por lote
+        Player.objects.bulk_create(
+            players,
+            update_conflicts=True,
+            unique_fields=["sofifa_id"],
+            update_fields=update_fields,
+        )
+        PlayerPosition.sync(players)
 
     def handle(self, *args, **kwargs):
         csv_file = kwargs["csv_file"]
+        batch_size = max(kwargs["batch_size"], 1)
+        incremental = kwargs["incremental"]
+        started = time.monotonic()
+        count = 0
+
+        # Na incremental o caminho local da imagem baixada é preservado
+        update_fields = UPDATE_FIELDS + ["content_hash"]
+        if incremental:
+            update_fields.remove("real_face_local")
 
-        with open(csv_file, newline="", encoding="utf-8") as f:
+        stored = dict(Player.objects.values_list("sofifa_id", "content_hash"))
+        seen = set()
+        added, changed = [], []
+
+        with open(csv_file, newline="", encoding="utf-8") as f, transaction.atomic():
             reader = csv.DictReader(f)
 
-            for row in reader:
-                try:
-                    sofifa_id = row["sofifa_id"]
-                except ValueError:
-                    self.stdout.write(self.style.ERROR(f"ID inválido: {row['sofifa_id']}"))
-                    continue
+            for players in self.read_batches(reader, batch_size):
+                delta = []
+                for player in players:
+                    seen.add(player.sofifa_id)
+                    if player.sofifa_id not in stored:
+                        added.append(player.sofifa_id)
+                        delta.append(player)
+                    elif stored[player.sofifa_id] != player.content_hash:
+                        changed.append(player.sofifa_id)
+                        delta.append(player)
+
+                self.write(delta if incremental else players, update_fields)
+                count += len(players)
+                self.stdout.write(f"{count} jogadores processados...")
+
+            removed = sorted(set(stored) - seen) if incremental else []
+            for start in range(0, len(removed), batch_size):
+                Player.objects.filter(sofifa_id__in=removed[start:start + batch_size]).delete()
+
+            changeset = ImportChangeset.objects.create(
+                source=csv_file,
+                incremental=incremental,
+                added=added,
+                changed=changed,
+                removed=removed,
+            )
+
+            # Rankings e resumos recalculados na mesma transação da importação
+            if changeset.affected_ids():
+                refresh_rankings(batch_size)
+                refresh_summaries(batch_size)
+
+        if changeset.affected_ids():
+            changeset.version = dataset.bump_version()
+            changeset.save(update_fields=["version"])
 
-                folder = sofifa_id[:3]
-                file = sofifa_id[3:]
-                real_face_url = f"https://cdn.sofifa.net/players/{folder}/{file}/21_120.png"
-
-
-                Player.objects.update_or_create(
-                    sofifa_id=sofifa_id,
-                    defaults={
-                        "player_url": row.get("player_url"),
-                        "short_name": row.get("short_name"),
-                        "long_name": row.get("long_name"),
-                        "age": row.get("age"),
-                        "club_name": row.get("club_name"),
-                        "league_name": row.get("league_name"),
-                        "nationality": row.get("nationality"),
-                        "player_positions": row.get("player_positions"),
-                        "overall": row.get("overall"),
-                        "potential": row.get("potential"),
-                        "value_eur": row.get("value_eur"),
-                        "real_face_local": real_face_url,
-                    },
-                )
-
-        self.stdout.write(self.style.SUCCESS("✅ Importação concluída com sucesso!"))
+        elapsed = time.monotonic() - started
+        rate = count / elapsed if elapsed else count
+        self.stdout.write(
+            f"Novos: {len(added)}, alterados: {len(changed)}, removidos: {len(removed)}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Importação concluída com sucesso! {count} jogadores em {elapsed:.1f}s ({rate:.0f} linhas/s)"
+        ))
@@ -1,6 +1,7 @@
 import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from players import dataset
 from players.models import Player
 
 class Command(BaseCommand):
@@ -39,4 +40,7 @@ class Command(BaseCommand):
             player.save()
             count += 1
 
+        if count:
+            dataset.bump_version()
+
         self.stdout.write(self.style.SUCCESS(f"Normalizados {count} jogadores"))
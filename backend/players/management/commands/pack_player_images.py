@@ -0,0 +1,40 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from players.images import ORIGINAL_VARIANT, DERIVATIVES_SUBDIR, images_dir, pack_paths, touch_images, write_pack
+
+class Command(BaseCommand):
+    help = "Empacota as fotos de uma variante num único arquivo + índice, servido via mmap"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            default=ORIGINAL_VARIANT,
+            choices=[ORIGINAL_VARIANT, "webp", "avif"],
+            help="png = fotos originais; webp/avif = versões reduzidas (padrão: png)",
+        )
+        parser.add_argument("--size", type=int, help="Tamanho da versão reduzida (obrigatório para webp/avif)")
+
+    def handle(self, *args, **options):
+        image_format = options["format"]
+        if image_format == ORIGINAL_VARIANT:
+            variant = ORIGINAL_VARIANT
+            source_dir = images_dir()
+        else:
+            if not options["size"]:
+                raise CommandError("Informe --size para empacotar versões reduzidas.")
+            variant = f"{image_format}-{options['size']}"
+            source_dir = os.path.join(images_dir(), DERIVATIVES_SUBDIR, str(options["size"]))
+
+        sources = []
+        if os.path.isdir(source_dir):
+            for entry in os.scandir(source_dir):
+                sofifa_id, extension = os.path.splitext(entry.name)
+                if entry.is_file() and sofifa_id.isdigit() and extension == f".{image_format}":
+                    sources.append((int(sofifa_id), entry.path))
+
+        count, size = write_pack(variant, sources)
+        touch_images()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Pacote '{variant}': {count} fotos, {size / 1024:.0f} KiB em {pack_paths(variant)[0]}"
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from players import dataset
+from players.rankings import refresh_rankings
+
+class Command(BaseCommand):
+    help = "Recalcula as colunas de ranking (geral, por liga, nacionalidade e posição principal)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de linhas gravadas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            updated = refresh_rankings(max(kwargs["batch_size"], 1))
+        if updated:
+            dataset.bump_version()
+
+        self.stdout.write(self.style.SUCCESS(f"Rankings atualizados: {updated} jogadores alterados."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from players import dataset
+from players.models import ClubSummary, LeagueSummary
+from players.summaries import refresh_summaries
+
+class Command(BaseCommand):
+    help = "Regrava os resumos de clubes e ligas (médias, valor total e melhor time)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de linhas gravadas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **kwargs):
+        counts = refresh_summaries(max(kwargs["batch_size"], 1))
+        dataset.bump_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumos atualizados: {counts[ClubSummary]} clubes, {counts[LeagueSummary]} ligas."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from players import dataset
+from players.models import Player, PlayerPosition
+
+class Command(BaseCommand):
+    help = "Regrava a tabela normalizada de posições a partir de player_positions"
+
+    def handle(self, *args, **kwargs):
+        players = Player.objects.only("sofifa_id", "player_positions")
+        PlayerPosition.sync(players)
+        dataset.bump_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Posições sincronizadas: {PlayerPosition.objects.count()} registros."
+        ))
@@ -1,4 +1,19 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Cast, Upper
+
+# Colunas filtradas com __icontains. No Postgres o lookup vira
+# UPPER("coluna"::text) LIKE UPPER('%valor%'); um índice GIN de trigramas
+# sobre exatamente essa expressão permite index scan em vez de seq scan.
+TRIGRAM_COLUMNS = ('short_name', 'long_name', 'club_name', 'league_name', 'nationality')
+
+
+def trigram_index(column):
+    return GinIndex(
+        OpClass(Upper(Cast(column, models.TextField())), name='gin_trgm_ops'),
+        name=f'player_{column}_trgm',
+    )
+
 
 class Player(models.Model):
     sofifa_id = models.BigIntegerField(primary_key=True)
@@ -15,6 +30,136 @@ class Player(models.Model):
     real_face_local = models.ImageField(upload_to="players_images/", blank=True, null= True)
     potential = models.IntegerField()
     value_eur = models.FloatField(null=False, blank=True)
+    # Hash das colunas importadas do CSV, usado pela importação incremental
+    content_hash = models.CharField(max_length=40, blank=True, default='', editable=False)
+    # Primeira posição de player_positions
+    primary_position = models.CharField(max_length=3, blank=True, default='', editable=False)
+    # Rankings por overall (1 = melhor), materializados por players.rankings
+    rank_overall = models.PositiveIntegerField(null=True, editable=False)
+    rank_in_league = models.PositiveIntegerField(null=True, editable=False)
+    rank_in_nationality = models.PositiveIntegerField(null=True, editable=False)
+    rank_in_position = models.PositiveIntegerField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            *(trigram_index(column) for column in TRIGRAM_COLUMNS),
+            # Ordem das listagens e da paginação por cursor
+            models.Index(fields=['-overall', 'sofifa_id'], name='player_overall_id_idx'),
+            # Top-k como leitura de intervalo do índice (rank <= k)
+            models.Index(fields=['rank_overall'], name='player_rank_overall_idx'),
+            models.Index(fields=['league_name', 'rank_in_league'], name='player_rank_league_idx'),
+            models.Index(fields=['nationality', 'rank_in_nationality'], name='player_rank_nation_idx'),
+            models.Index(fields=['primary_position', 'rank_in_position'], name='player_rank_position_idx'),
+        ]
 
     def __str__(self):
-        return self.short_name
\ No newline at end of file
+        return self.short_name
+
+
+def split_positions(value):
+    """Converte "RW, ST, CF" em ['RW', 'ST', 'CF'], mantendo a ordem original."""
+    positions = []
+    for position in (value or '').split(','):
+        position = position.strip().upper()
+        if position and position not in positions:
+            positions.append(position)
+    return positions
+
+
+class PlayerPosition(models.Model):
+    """Forma normalizada de Player.player_positions, uma linha por posição."""
+
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='positions')
+    position = models.CharField(max_length=3)
+    order = models.PositiveSmallIntegerField(default=0)  # 0 = posição principal
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'position'], name='unique_player_position'),
+        ]
+        indexes = [models.Index(fields=['position', 'player'], name='player_position_idx')]
+
+    def __str__(self):
+        return f'{self.player_id} {self.position}'
+
+    @classmethod
+    def sync(cls, players, batch_size=1000):
+        """Regrava as posições normalizadas dos jogadores informados."""
+        players = list(players)
+        for start in range(0, len(players), batch_size):
+            ids = [player.pk for player in players[start:start + batch_size]]
+            cls.objects.filter(player_id__in=ids).delete()
+
+        cls.objects.bulk_create(
+            [
+                cls(player_id=player.pk, position=position, order=order)
+                for player in players
+                for order, position in enumerate(split_positions(player.player_positions))
+            ],
+            batch_size=batch_size,
+        )
+
+
+class ImportChangeset(models.Model):
+    """Ids adicionados, alterados e removidos por uma execução do import_players."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    source = models.CharField(max_length=255)
+    version = models.CharField(max_length=32, blank=True, default='')
+    incremental = models.BooleanField(default=False)
+    added = models.JSONField(default=list)
+    changed = models.JSONField(default=list)
+    removed = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.source} (+{len(self.added)} ~{len(self.changed)} -{len(self.removed)})'
+
+    def affected_ids(self):
+        return set(self.added) | set(self.changed) | set(self.removed)
+
+
+
+class GroupSummary(models.Model):
+    """Agregados de um grupo de jogadores, materializados por players.summaries."""
+
+    name = models.CharField(max_length=100, unique=True)
+    player_count = models.PositiveIntegerField()
+    avg_overall = models.FloatField()
+    avg_age = models.FloatField()
+    total_value_eur = models.FloatField()
+    # Média de overall do melhor time (players.summaries.BEST_XI_FORMATION)
+    best_xi_rating = models.FloatField()
+    # [{"position": "GK", "sofifa_id": 200389}, ...] na ordem das vagas
+    best_xi = models.JSONField(default=list)
+
+    class Meta:
+        abstract = True
+        ordering = ['-avg_overall', 'name']
+
+    def __str__(self):
+        return self.name
+
+
+def summary_indexes(prefix):
+    # Rankings (maior primeiro) lidos direto do índice
+    return [
+        models.Index(fields=[f'-{column}', 'name'], name=f'{prefix}_{column}_idx')
+        for column in ('avg_overall', 'avg_age', 'total_value_eur', 'best_xi_rating', 'player_count')
+    ]
+
+
+class ClubSummary(GroupSummary):
+    league_name = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta(GroupSummary.Meta):
+        indexes = summary_indexes('club')
+
+
+class LeagueSummary(GroupSummary):
+    club_count = models.PositiveIntegerField()
+
+    class Meta(GroupSummary.Meta):
+        indexes = summary_indexes('league')
@@ -1,6 +1,119 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Paginação por cursor sobre a ordem (-overall, sofifa_id).
+
+    Cada página continua a partir do último jogador da anterior, então o custo
+    não cresce com a profundidade (sem OFFSET). O total é opcional: com
+    ``count=false`` o COUNT(*) não é executado.
+    """
+
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = StandardResultsSetPagination.max_page_size
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        params = request.query_params
+        return cls.cursor_query_param in params or params.get('pagination') == 'cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, position):
+        return b64encode(f'{position[0]}:{position[1]}'.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            overall, sofifa_id = b64decode(encoded.encode()).decode().split(':')
+            return int(overall), int(sofifa_id)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def get_position(item):
+        if isinstance(item, dict):
+            return item['overall'], item['sofifa_id']
+        return item.overall, item.sofifa_id
+
+    @staticmethod
+    def after(items, position):
+        overall, sofifa_id = position
+        if isinstance(items, QuerySet):
+            # overall <= x vira condição de índice; o OR só filtra os empates
+            return items.filter(
+                Q(overall__lt=overall) | Q(overall=overall, sofifa_id__gt=sofifa_id),
+                overall__lte=overall,
+            )
+        return items.after(overall, sofifa_id)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, 'true').lower() != 'false':
+            self.count = queryset.count() if isinstance(queryset, QuerySet) else len(queryset)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = self.after(queryset, position)
+
+        items = list(queryset[:page_size + 1])
+        page = items[:page_size]
+        self.next_position = self.get_position(page[-1]) if len(items) > page_size else None
+        return page
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class PlayerPagination(StandardResultsSetPagination):
+    """Paginação por página; usa KeysetPagination com ?cursor= ou ?pagination=cursor."""
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if KeysetPagination.requested(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
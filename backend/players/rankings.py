@@ -0,0 +1,107 @@
+from django.db import connection
+
+from . import dataset
+from .models import Player, split_positions
+
+# Rankings materializados nas colunas rank_* de Player.
+#
+# Todos seguem a ordem das listagens (-overall, sofifa_id), com ROW_NUMBER, então
+# o rank é único dentro do grupo e "top k" vira rank <= k, uma leitura de
+# intervalo dos índices (grupo, rank). São recalculados pelo import_players,
+# pelo admin e pelo comando refresh_rankings.
+
+RANKINGS = {
+    'rank_overall': None,
+    'rank_in_league': 'league_name',
+    'rank_in_nationality': 'nationality',
+    'rank_in_position': 'primary_position',
+}
+RANK_FIELDS = tuple(RANKINGS)
+
+
+def primary_position(player_positions):
+    positions = split_positions(player_positions)
+    return positions[0] if positions else ''
+
+
+def _refresh_primary_positions(batch_size):
+    stale = [
+        Player(sofifa_id=sofifa_id, primary_position=primary_position(positions))
+        for sofifa_id, positions, current in Player.objects.values_list(
+            'sofifa_id', 'player_positions', 'primary_position'
+        )
+        if primary_position(positions) != current
+    ]
+    Player.objects.bulk_update(stale, ['primary_position'], batch_size=batch_size)
+
+
+def _refresh_ranks_sql():
+    # UPDATE ... FROM (Postgres e SQLite >= 3.33): uma única instrução, que só
+    # reescreve as linhas cujo rank mudou
+    qn = connection.ops.quote_name
+    table = qn(Player._meta.db_table)
+    windows = ',\n'.join(
+        f'ROW_NUMBER() OVER ({f"PARTITION BY {qn(partition)} " if partition else ""}'
+        f'ORDER BY {qn("overall")} DESC, {qn("sofifa_id")}) AS {qn(field)}'
+        for field, partition in RANKINGS.items()
+    )
+    assignments = ', '.join(f'{qn(field)} = ranked.{qn(field)}' for field in RANK_FIELDS)
+    changed = ' OR '.join(f'COALESCE({table}.{qn(field)}, 0) <> ranked.{qn(field)}' for field in RANK_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            UPDATE {table} SET {assignments}
+            FROM (SELECT {qn("sofifa_id")}, {windows} FROM {table}) AS ranked
+            WHERE {table}.{qn("sofifa_id")} = ranked.{qn("sofifa_id")} AND ({changed})
+        ''')
+        return cursor.rowcount
+
+
+def _refresh_ranks_python(batch_size):
+    players = list(Player.objects.order_by('-overall', 'sofifa_id').only(
+        'sofifa_id', 'league_name', 'nationality', 'primary_position', *RANK_FIELDS
+    ))
+    counters = {field: {} for field in RANK_FIELDS}
+    stale = []
+    for player in players:
+        changed = False
+        for field, partition in RANKINGS.items():
+            group = getattr(player, partition) if partition else None
+            rank = counters[field][group] = counters[field].get(group, 0) + 1
+            if getattr(player, field) != rank:
+                setattr(player, field, rank)
+                changed = True
+        if changed:
+            stale.append(player)
+    Player.objects.bulk_update(stale, RANK_FIELDS, batch_size=batch_size)
+    return len(stale)
+
+
+def refresh_rankings(batch_size=1000):
+    """Recalcula primary_position e os rankings; retorna quantos jogadores mudaram de rank."""
+    _refresh_primary_positions(batch_size)
+    if connection.vendor == 'postgresql' or (connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 33)):
+        return _refresh_ranks_sql()
+    return _refresh_ranks_python(batch_size)
+
+
+def _ready_key():
+    version = dataset.current_version()
+    # Sem versão ("0") o dataset nunca foi versionado: não há como invalidar,
+    # então a chave nunca se repete e o banco é consultado toda vez
+    return version if version != "0" else object()
+
+
+def _all_ranked(version):
+    """True se todos os jogadores têm ranking (bancos antigos precisam do refresh_rankings)."""
+    return not Player.objects.filter(rank_overall__isnull=True).exists()
+
+
+# Consulta o banco uma vez por versão do dataset
+rankings_ready = dataset.versioned(_all_ranked, key=_ready_key)
+
+
+def top_overall(k):
+    """Os k melhores por overall, pelo rank materializado (None se os rankings não estão prontos)."""
+    if not rankings_ready():
+        return None
+    return Player.objects.filter(rank_overall__lte=k).order_by('rank_overall')
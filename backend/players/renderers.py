@@ -0,0 +1,32 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+# Opções que deixam a saída do orjson igual à do json.dumps usado pelo
+# JSONRenderer: datas e dataclasses passam pelo encoder do DRF.
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer que serializa com orjson, produzindo os mesmos bytes."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # Ex.: inteiros maiores que 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Mesmo escape de U+2028/U+2029 que o JSONRenderer faz
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
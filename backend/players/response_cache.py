@@ -0,0 +1,275 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from . import dataset
+
+# Cache de respostas dos endpoints de jogadores.
+#
+# A chave junta o endpoint, os parâmetros normalizados, o Accept, o host e a
+# versão do dataset. Como a versão muda a cada importação, uma resposta de um
+# dataset anterior nunca é encontrada; as entradas antigas só saem por LRU ou
+# TTL (no FileBackend, por uma varredura periódica). O valor guardado é a
+# resposta já renderizada (status, cabeçalhos e corpo), então um acerto não
+# passa pelo ORM, pelo índice nem pelo renderer.
+
+
+class LRUBackend:
+    """Cache em memória do processo, limitado em entradas e em bytes."""
+
+    shared = False
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._size += len(value[2])
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._size -= len(value[2])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class DjangoCacheBackend:
+    """Usa um alias de CACHES (ex.: Redis/Memcached compartilhado entre workers).
+
+    As chaves levam uma geração guardada no próprio alias; clear() só avança a
+    geração, sem apagar o que outras partes do projeto guardam no mesmo alias.
+    """
+
+    shared = True
+    GENERATION_KEY = 'players:response:generation'
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+
+    def _generation(self):
+        return caches[self.alias].get_or_set(self.GENERATION_KEY, 1, timeout=None)
+
+    def get(self, key):
+        return caches[self.alias].get(f'players:response:{key}', version=self._generation())
+
+    def set(self, key, value, ttl):
+        caches[self.alias].set(f'players:response:{key}', value, timeout=ttl, version=self._generation())
+
+    def clear(self):
+        cache = caches[self.alias]
+        try:
+            cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            # Geração expulsa do cache: recomeça acima de qualquer valor usado
+            cache.set(self.GENERATION_KEY, int(time.time()), timeout=None)
+
+
+class FileBackend:
+    """Um arquivo por resposta, compartilhado entre os processos da máquina.
+
+    O mtime de cada arquivo é a hora em que ele expira. A cada ``sweep_every``
+    gravações o diretório é varrido: saem os arquivos expirados e, acima de
+    ``max_entries``, os que expiram primeiro.
+    """
+
+    shared = True
+
+    def __init__(self, directory=None, max_entries=10000, sweep_every=256):
+        self.directory = directory or os.path.join(settings.BASE_DIR, 'var', 'response_cache')
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires, value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError):
+            self._remove(path)
+            return None
+        if expires < time.time():
+            self._remove(path)
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        expires = time.time() + ttl
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((expires, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.utime(tmp_path, (expires, expires))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self):
+        """Remove os arquivos expirados e os excedentes; retorna quantos saíram."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    expires = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue
+                if expires < now:
+                    removed += self._remove(path)
+                else:
+                    entries.append((expires, path))
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                removed += self._remove(path)
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        # Outro processo pode ter removido ou regravado o arquivo
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return 1
+
+    def clear(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                os.remove(os.path.join(root, name))
+
+
+BACKENDS = {
+    'lru': LRUBackend,
+    'django': DjangoCacheBackend,
+    'file': FileBackend,
+}
+
+
+def response_key(endpoint, request):
+    """Chave da resposta: endpoint, parâmetros normalizados, Accept, host e versão."""
+    params = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        for value in values
+        if value != ''
+    )
+    parts = (
+        endpoint,
+        request.scheme,
+        request.get_host(),
+        request.path,
+        repr(params),
+        request.headers.get('Accept', ''),
+        dataset.current_version(),
+    )
+    return hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, backend, timeout, timeouts):
+        self.backend = backend
+        self.timeout = timeout
+        self.timeouts = timeouts
+        self._stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'coalesced': 0})
+        self._stats_lock = threading.Lock()
+
+    def ttl(self, endpoint):
+        return self.timeouts.get(endpoint, self.timeout)
+
+    def get(self, endpoint, key):
+        value = self.backend.get(key)
+        self.count(endpoint, 'hits' if value is not None else 'misses')
+        return value
+
+    def set(self, endpoint, key, value):
+        self.backend.set(key, value, self.ttl(endpoint))
+
+    def count(self, endpoint, counter):
+        with self._stats_lock:
+            self._stats[endpoint][counter] += 1
+
+    def stats(self):
+        """Acertos e falhas por endpoint, desde a subida do processo."""
+        with self._stats_lock:
+            return {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+
+    def clear(self):
+        self.backend.clear()
+        with self._stats_lock:
+            self._stats.clear()
+
+
+_lock = threading.Lock()
+_cache = None
+
+
+def get_response_cache():
+    """Cache configurado em PLAYERS_RESPONSE_CACHE, ou None se desabilitado."""
+    global _cache
+
+    config = settings.PLAYERS_RESPONSE_CACHE
+    if not config.get('BACKEND'):
+        return None
+
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                backend = BACKENDS[config['BACKEND']](**config.get('OPTIONS', {}))
+                _cache = ResponseCache(backend, config.get('TIMEOUT', 300), config.get('TIMEOUTS', {}))
+    return _cache
+
+
+@receiver(setting_changed)
+def _reset_response_cache(setting, **kwargs):
+    global _cache
+
+    if setting == 'PLAYERS_RESPONSE_CACHE':
+        _cache = None
@@ -1,13 +1,94 @@
 from rest_framework import serializers
-from players.models import Player
+from players.models import ClubSummary, LeagueSummary, Player
+
+# Campos de saída, na mesma ordem do PlayerSerializer
+PLAYER_FIELDS = (
+    'sofifa_id', 'real_face_local', 'player_url', 'short_name', 'long_name', 'age',
+    'club_name', 'league_name', 'nationality', 'player_positions', 'overall',
+    'real_face', 'potential', 'value_eur', 'primary_position', 'rank_overall',
+    'rank_in_league', 'rank_in_nationality', 'rank_in_position',
+)
+# Colunas sempre lidas: chave da ordenação e da paginação por cursor
+KEY_COLUMNS = ('sofifa_id', 'overall')
+
+
+def face_url(sofifa_id, real_face_local):
+    if real_face_local:
+        return f'/api/players/image/{sofifa_id}/'  # usa endpoint para servir arquivo
+    return '/placeholder.svg'
+
+
 class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
-        fields = '__all__'
+        exclude = ('content_hash',)
 
     real_face_local = serializers.SerializerMethodField()
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def get_real_face_local(self, obj):
-        if obj.real_face_local:
-            return f'/api/players/image/{obj.sofifa_id}/'  # usa endpoint para servir arquivo
-        return '/placeholder.svg'
\ No newline at end of file
+        return face_url(obj.sofifa_id, obj.real_face_local)
+
+
+def selected_fields(params):
+    """Campos de saída pedidos com ?fields= e/ou ?exclude= (separados por vírgula)."""
+    fields = PLAYER_FIELDS
+    for param in ('fields', 'exclude'):
+        names = {name.strip() for name in params.get(param, '').split(',') if name.strip()}
+        if not names:
+            continue
+        unknown = names - set(PLAYER_FIELDS)
+        if unknown:
+            raise serializers.ValidationError({param: f"Unknown fields: {', '.join(sorted(unknown))}"})
+        if param == 'fields':
+            fields = tuple(field for field in fields if field in names)
+        else:
+            fields = tuple(field for field in fields if field not in names)
+    return fields
+
+
+def query_columns(fields=PLAYER_FIELDS):
+    """Colunas do banco necessárias para montar os campos de saída."""
+    return KEY_COLUMNS + tuple(field for field in fields if field not in KEY_COLUMNS)
+
+
+def player_data(row, fields=PLAYER_FIELDS):
+    """Mesmo dict do PlayerSerializer, montado direto de uma linha de .values()."""
+    data = {field: row[field] for field in fields}
+    if 'real_face_local' in data:
+        data['real_face_local'] = face_url(row['sofifa_id'], row['real_face_local'])
+    if 'value_eur' in data:
+        data['value_eur'] = float(data['value_eur'])
+    return data
+
+
+def player_values(queryset, fields=PLAYER_FIELDS):
+    return queryset.values(*query_columns(fields))
+
+
+def player_instance_data(player, fields=PLAYER_FIELDS):
+    return player_data({field: getattr(player, field) for field in query_columns(fields)}, fields)
+
+
+def project(rows, fields):
+    """Recorta linhas já serializadas (ex.: do índice) nos campos pedidos."""
+    if fields == PLAYER_FIELDS:
+        return list(rows)
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+class ClubSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ClubSummary
+        exclude = ('id',)
+
+
+class LeagueSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LeagueSummary
+        exclude = ('id',)
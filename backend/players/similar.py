@@ -0,0 +1,100 @@
+
+import numpy as np
+from rest_framework.exceptions import ValidationError
+
+from . import dataset
+from .index import PlayerIndex, get_player_index
+
+# Busca de jogadores parecidos (vizinhos mais próximos).
+#
+# Cada jogador vira um vetor com overall, potential, idade e log(valor)
+# padronizados (média 0, desvio 1) e as posições em one-hot, normalizadas para
+# norma POSITION_WEIGHT. A matriz inteira (~19k x ~20, float32) fica em
+# memória e é refeita quando a versão do dataset muda. Os filtros viram uma
+# máscara sobre as linhas antes do cálculo das distâncias, e várias consultas
+# são resolvidas juntas com um único produto de matrizes por bloco.
+
+NUMERIC_FEATURES = ('overall', 'potential', 'age', 'value_eur')
+POSITION_WEIGHT = 1.0
+DEFAULT_K = 10
+MAX_K = 50
+# Consultas por bloco no lote (limita a matriz de distâncias a ~BLOCK x 19k)
+BLOCK = 128
+
+
+def parse_k(params):
+    try:
+        k = int(params.get('k', DEFAULT_K))
+    except (TypeError, ValueError):
+        raise ValidationError({'k': 'k must be an integer'})
+    if not 1 <= k <= MAX_K:
+        raise ValidationError({'k': f'k must be between 1 and {MAX_K}'})
+    return k
+
+
+def standardize(values):
+    std = values.std()
+    return (values - values.mean()) / (std if std else 1)
+
+
+class SimilarityIndex:
+    def __init__(self, players):
+        self.players = players
+        self.version = players.version
+
+        numeric = [
+            getattr(players, feature).astype(np.float64) for feature in NUMERIC_FEATURES
+        ]
+        # Valores de mercado vão de milhares a centenas de milhões
+        numeric[NUMERIC_FEATURES.index('value_eur')] = np.log1p(players.value_eur)
+
+        positions = np.zeros((len(players), len(players.position_vocab)))
+        for i in range(len(players.position_vocab)):
+            positions[:, i] = (players.position_mask & np.uint64(1 << i)) != 0
+        counts = positions.sum(axis=1, keepdims=True)
+        positions *= POSITION_WEIGHT / np.sqrt(np.maximum(counts, 1))
+
+        self.vectors = np.column_stack([standardize(column) for column in numeric] + [positions]).astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+
+    def neighbours(self, ids, k, criteria=None):
+        """{sofifa_id: [(linha, distância), ...]} para cada id conhecido, do mais parecido ao menos."""
+        players = self.players
+        rows = np.array([players.row_by_id[sofifa_id] for sofifa_id in ids if sofifa_id in players.row_by_id], dtype=np.int64)
+        candidates = np.flatnonzero(players.mask(criteria or {}))
+        vectors, norms = self.vectors[candidates], self.norms[candidates]
+
+        result = {}
+        for start in range(0, len(rows), BLOCK):
+            block = rows[start:start + BLOCK]
+            # |a - b|^2 = |a|^2 - 2 a.b + |b|^2, para o bloco inteiro de uma vez
+            distances = self.norms[block, None] - 2 * (self.vectors[block] @ vectors.T) + norms[None, :]
+            np.maximum(distances, 0, out=distances)
+            # O próprio jogador não entra nos resultados
+            distances[candidates[None, :] == block[:, None]] = np.inf
+
+            # Um a mais, para o caso de o próprio jogador estar entre os candidatos
+            count = min(k + 1, len(candidates))
+            for row, row_distances in zip(block, distances):
+                if count < len(candidates):
+                    best = np.argpartition(row_distances, count - 1)[:count]
+                else:
+                    best = np.arange(len(candidates))
+                # Empates desempatados pela ordem das listagens (-overall, sofifa_id)
+                best = best[np.lexsort((candidates[best], row_distances[best]))]
+                best = best[np.isfinite(row_distances[best])][:k]
+                result[int(players.sofifa_id[row])] = [
+                    (int(candidates[i]), float(np.sqrt(row_distances[i]))) for i in best
+                ]
+        return result
+
+
+def build_similarity_index(version):
+    """Vetores de atributos sobre o índice de jogadores (montado aqui se estiver desabilitado)."""
+    players = get_player_index()
+    if players is None or players.version != version:
+        players = PlayerIndex.build(version)
+    return SimilarityIndex(players)
+
+
+get_similarity_index = dataset.versioned(build_similarity_index)
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Coalescência de requisições idênticas (single-flight).
+#
+# Dentro do processo, a primeira requisição de uma chave calcula a resposta e
+# as concorrentes esperam pelo mesmo resultado. Entre processos, quem calcula
+# segura um lock por chave (pg_advisory_lock no Postgres, flock num arquivo nos
+# demais bancos); os outros workers esperam o lock e então encontram a
+# resposta no cache compartilhado.
+
+
+LOCK_STRIPES = 1024
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout):
+        """Executa fn uma única vez entre as chamadas concorrentes com a mesma chave.
+
+        Retorna (resultado, compartilhado). Se quem calculava falhou ou não
+        terminou em ``timeout`` segundos, retorna (None, True) e o chamador
+        calcula por conta própria.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if not call.done.wait(timeout) or call.failed:
+                return None, True
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+_flights = SingleFlight()
+
+
+def single_flight(key, fn):
+    timeout = settings.PLAYERS_SINGLE_FLIGHT_TIMEOUT
+    if not timeout:
+        return fn(), False
+    return _flights.do(key, fn, timeout)
+
+
+def _lock_id(key):
+    # pg_advisory_lock recebe um bigint
+    return int.from_bytes(hashlib.sha1(key.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def _advisory_lock(key, timeout):
+    lock_id = _lock_id(key)
+    deadline = time.monotonic() + timeout
+    acquired = False
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [lock_id])
+            acquired = cursor.fetchone()[0]
+            if acquired or time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [lock_id])
+
+
+@contextmanager
+def _file_lock(key, timeout):
+    directory = os.path.join(os.path.dirname(settings.PLAYERS_DATASET_VERSION_FILE), 'locks')
+    os.makedirs(directory, exist_ok=True)
+    deadline = time.monotonic() + timeout
+    acquired = False
+    # Chaves distribuídas em LOCK_STRIPES arquivos, para não acumular um por consulta
+    with open(os.path.join(directory, f'{_lock_id(key) % LOCK_STRIPES}.lock'), 'a') as f:
+        while True:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                acquired = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(0.05)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def process_lock(key):
+    """Lock entre processos para a chave; depois do timeout segue sem ele."""
+    timeout = settings.PLAYERS_SINGLE_FLIGHT_TIMEOUT
+    if not timeout:
+        yield False
+    elif connection.vendor == 'postgresql':
+        with _advisory_lock(key, timeout) as acquired:
+            yield acquired
+    elif fcntl is not None:
+        with _file_lock(key, timeout) as acquired:
+            yield acquired
+    else:
+        yield False
@@ -0,0 +1,122 @@
+import numpy as np
+
+# Montagem do melhor time.
+#
+# Cada formação é uma lista de vagas (uma posição por vaga). A escalação ótima
+# é um emparelhamento bipartido de peso máximo entre vagas e jogadores,
+# resolvido pelo algoritmo húngaro. Jogadores fora de posição só entram se não
+# houver ninguém da posição disponível (a penalidade é maior que qualquer
+# diferença de overall).
+
+FORMATIONS = {
+    '4-3-3': ['GK', 'RB', 'CB', 'CB', 'LB', 'CDM', 'CM', 'CM', 'LW', 'ST', 'RW'],
+    '4-4-2': ['GK', 'RB', 'CB', 'CB', 'LB', 'RM', 'CM', 'CM', 'LM', 'ST', 'ST'],
+    '4-2-3-1': ['GK', 'RB', 'CB', 'CB', 'LB', 'CDM', 'CDM', 'RM', 'CAM', 'LM', 'ST'],
+    '4-1-2-1-2': ['GK', 'RB', 'CB', 'CB', 'LB', 'CDM', 'CM', 'CM', 'CAM', 'ST', 'ST'],
+    '4-5-1': ['GK', 'RB', 'CB', 'CB', 'LB', 'RM', 'CM', 'CDM', 'CM', 'LM', 'ST'],
+    '3-4-3': ['GK', 'CB', 'CB', 'CB', 'RM', 'CM', 'CM', 'LM', 'RW', 'ST', 'LW'],
+    '3-5-2': ['GK', 'CB', 'CB', 'CB', 'RWB', 'CM', 'CDM', 'CM', 'LWB', 'ST', 'ST'],
+    '5-3-2': ['GK', 'RWB', 'CB', 'CB', 'CB', 'LWB', 'CM', 'CM', 'CM', 'ST', 'ST'],
+}
+
+POSITIONS = {
+    'GK', 'RB', 'RWB', 'CB', 'LB', 'LWB', 'CDM', 'CM', 'CAM',
+    'RM', 'LM', 'RW', 'LW', 'CF', 'ST',
+}
+
+OUT_OF_POSITION_PENALTY = 1000
+
+
+def parse_formation(value):
+    """Converte o parâmetro ``formation`` numa lista de vagas.
+
+    Aceita uma formação conhecida ("4-4-2") ou uma lista explícita de 11
+    posições separadas por vírgula ("GK,CB,CB,...").
+    """
+    value = (value or '4-3-3').strip()
+    if value in FORMATIONS:
+        return list(FORMATIONS[value])
+
+    slots = [slot.strip().upper() for slot in value.split(',') if slot.strip()]
+    if len(slots) != 11 or not set(slots) <= POSITIONS:
+        raise ValueError(
+            f"Invalid formation: '{value}'. Use one of {', '.join(FORMATIONS)} "
+            f"or 11 comma-separated positions."
+        )
+    return slots
+
+
+def linear_sum_assignment(cost):
+    """Algoritmo húngaro (custo mínimo) para matrizes retangulares.
+
+    Retorna pares (linha, coluna) cobrindo min(linhas, colunas) elementos.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return []
+
+    # Potenciais u (linhas) e v (colunas); p[j] = linha atribuída à coluna j.
+    # Índice 0 é uma coluna fictícia, como na formulação clássica O(n^2 m).
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            improve = free & (reduced < minv[1:])
+            minv[1:][improve] = reduced[improve]
+            way[1:][improve] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+
+def best_lineup(slots, candidates):
+    """Escolhe a escalação de maior overall total para as vagas informadas.
+
+    ``candidates`` é uma lista de tuplas (jogador, posições, nota). Retorna uma
+    lista de (posição da vaga, jogador) na ordem das vagas; vagas sem jogador
+    disponível ficam de fora.
+    """
+    if not slots or not candidates:
+        return []
+
+    weights = np.empty((len(slots), len(candidates)))
+    for j, (_, positions, score) in enumerate(candidates):
+        for i, slot in enumerate(slots):
+            weights[i, j] = score if slot in positions else score - OUT_OF_POSITION_PENALTY
+
+    # Maximizar o peso equivale a minimizar o custo negativo
+    pairs = linear_sum_assignment(-weights)
+    return [(slots[i], candidates[j][0]) for i, j in pairs]
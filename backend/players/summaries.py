@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q, Sum
+
+from .models import ClubSummary, LeagueSummary, Player, split_positions
+from .solver import FORMATIONS, best_lineup
+
+# Tabelas de resumo de clubes e ligas (ClubSummary / LeagueSummary).
+#
+# Os agregados saem de um GROUP BY por grupo; o melhor time de cada grupo é
+# montado com o mesmo solver do BestTeamView, sobre um conjunto reduzido de
+# candidatos. As tabelas são regravadas por inteiro pelo import_players e pelo
+# comando refresh_summaries (o admin só regrava os clubes e ligas afetados),
+# então cada página dos rankings de clubes e ligas é uma leitura simples e
+# indexada.
+
+BEST_XI_FORMATION = '4-3-3'
+SUMMARIES = {
+    'club_name': ClubSummary,
+    'league_name': LeagueSummary,
+}
+
+
+def best_xi(players, slots):
+    """Melhor time de ``players`` (dicts ordenados por -overall, sofifa_id)."""
+    # Só os len(slots) melhores de cada posição (e do geral, para vagas sem
+    # ninguém da posição) podem entrar numa escalação ótima
+    per_position = {}
+    candidates = {}
+    for player in players:
+        positions = set(split_positions(player['player_positions']))
+        for position in positions & set(slots):
+            if per_position.get(position, 0) < len(slots):
+                per_position[position] = per_position.get(position, 0) + 1
+                candidates[player['sofifa_id']] = (player, positions, player['overall'])
+    for player in players[:len(slots)]:
+        candidates.setdefault(
+            player['sofifa_id'], (player, set(split_positions(player['player_positions'])), player['overall'])
+        )
+    return best_lineup(slots, list(candidates.values()))
+
+
+def summarize(column, slots, names=None):
+    model = SUMMARIES[column]
+    players = Player.objects.exclude(**{column: ''})
+    if names is not None:
+        players = players.filter(**{f'{column}__in': names})
+
+    rows = {}
+    for player in players.order_by('-overall', 'sofifa_id').values(
+        'sofifa_id', column, 'player_positions', 'overall'
+    ).iterator(chunk_size=2000):
+        rows.setdefault(player[column], []).append(player)
+
+    extra = {'league_name': Max('league_name')} if model is ClubSummary else {
+        'club_count': Count('club_name', distinct=True, filter=~Q(club_name='')),
+    }
+    aggregates = players.values(column).annotate(
+        player_count=Count('pk'),
+        avg_overall=Avg('overall'),
+        avg_age=Avg('age'),
+        total_value_eur=Sum('value_eur'),
+        **extra,
+    ).order_by(column)
+
+    summaries = []
+    for aggregate in aggregates:
+        name = aggregate.pop(column)
+        lineup = best_xi(rows[name], slots)
+        summaries.append(model(
+            name=name,
+            best_xi_rating=round(sum(player['overall'] for _, player in lineup) / len(lineup), 2),
+            best_xi=[{'position': position, 'sofifa_id': player['sofifa_id']} for position, player in lineup],
+            **{
+                **aggregate,
+                'avg_overall': round(aggregate['avg_overall'], 2),
+                'avg_age': round(aggregate['avg_age'], 2),
+            },
+        ))
+    return model, summaries
+
+
+@transaction.atomic
+def refresh_summaries(batch_size=1000, groups=None):
+    """Regrava as tabelas de resumo; retorna {modelo: quantidade de grupos}.
+
+    ``groups`` ({'club_name': nomes, 'league_name': nomes}) limita a regravação
+    a esses clubes e ligas; grupos que ficaram sem jogadores são removidos.
+    """
+    slots = FORMATIONS[BEST_XI_FORMATION]
+    counts = {}
+    for column, model in SUMMARIES.items():
+        names = None
+        stale = model.objects.all()
+        if groups is not None:
+            names = set(groups.get(column, ())) - {''}
+            stale = stale.filter(name__in=names)
+        model, summaries = summarize(column, slots, names)
+        stale.delete()
+        model.objects.bulk_create(summaries, batch_size=batch_size)
+        counts[model] = len(summaries)
+    return counts
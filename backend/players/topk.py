@@ -0,0 +1,141 @@
+import heapq
+
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from .filters import filter_players
+from .index import METRICS
+from .models import Player, PlayerPosition
+from .rankings import rankings_ready
+from .serializers import player_data, query_columns
+
+# Top-k por grupo ("5 melhores de cada clube", "3 melhores por liga e posição").
+#
+# No banco é uma única consulta com ROW_NUMBER() OVER (PARTITION BY grupo
+# ORDER BY métrica DESC, sofifa_id). Bancos sem funções de janela usam um heap
+# de tamanho k por grupo, numa única passada pelas linhas. Sem filtros, o top
+# por overall de uma liga ou nacionalidade já está materializado em
+# rank_in_league / rank_in_nationality (ver players.rankings).
+
+GROUPS = {
+    'club': 'club_name',
+    'league': 'league_name',
+    'nationality': 'nationality',
+    'position': 'position',
+}
+DEFAULT_K = 5
+MAX_K = 50
+# Listas paginadas de /top-k/ e /top-by-criteria/
+LIST_DEFAULT_K = 10
+LIST_MAX_K = 1000
+# Grupos com ranking por overall materializado
+RANKED_GROUPS = {
+    'league': 'rank_in_league',
+    'nationality': 'rank_in_nationality',
+}
+
+
+def parse_top_k(params, default=DEFAULT_K, maximum=MAX_K):
+    """?k= como inteiro entre 1 e ``maximum``."""
+    try:
+        k = int(params.get('k', default))
+    except ValueError:
+        raise ValidationError({'k': 'k must be an integer'})
+    if not 1 <= k <= maximum:
+        raise ValidationError({'k': f'k must be between 1 and {maximum}'})
+    return k
+
+
+def parse_grouping(params):
+    """(grupos, k, métrica) a partir de ?group_by=, ?k= e ?metric=."""
+    groups = [name.strip() for name in params.get('group_by', '').split(',') if name.strip()]
+    if not groups or set(groups) - set(GROUPS):
+        raise ValidationError({'group_by': f"Use one or more of {', '.join(GROUPS)}"})
+
+    metric = params.get('metric', 'overall')
+    if metric not in METRICS:
+        raise ValidationError({'metric': f"Use one of {', '.join(METRICS)}"})
+
+    return list(dict.fromkeys(groups)), parse_top_k(params), metric
+
+
+def _rows(queryset, groups, metric, fields):
+    """Linhas (dicts) com as colunas de saída, dos grupos e da métrica.
+
+    Retorna também a partição e a ordem da janela, já no caminho certo
+    (Player ou PlayerPosition).
+    """
+    group_columns = [GROUPS[group] for group in groups]
+    columns = tuple(dict.fromkeys(query_columns(fields) + (metric,) + tuple(group_columns)))
+
+    if 'position' in groups:
+        # Um jogador aparece em cada uma das suas posições
+        rows = PlayerPosition.objects.filter(player__in=queryset)
+        for column in group_columns:
+            if column != 'position':
+                rows = rows.exclude(**{f'player__{column}': ''})
+        rows = rows.values('position', **{
+            column: F(f'player__{column}') for column in columns if column != 'position'
+        })
+        partition = [F(column if column == 'position' else f'player__{column}') for column in group_columns]
+        order = [F(f'player__{metric}').desc(), F('player_id').asc()]
+        return rows, partition, order
+
+    for column in group_columns:
+        queryset = queryset.exclude(**{column: ''})
+    partition = [F(column) for column in group_columns]
+    order = [F(metric).desc(), F('sofifa_id').asc()]
+    return queryset.values(*columns), partition, order
+
+
+def _window_top_k(rows, partition, order, k):
+    ranked = rows.annotate(group_rank=Window(RowNumber(), partition_by=partition, order_by=order))
+    return ranked.filter(group_rank__lte=k)
+
+
+def _heap_top_k(rows, group_columns, metric, k):
+    heaps = {}
+    for row in rows.iterator(chunk_size=2000):
+        key = tuple(row[column] for column in group_columns)
+        # Menor item = pior jogador do heap: menor métrica, depois maior sofifa_id
+        item = (row[metric], -row['sofifa_id'], row)
+        heap = heaps.setdefault(key, [])
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    return [
+        item[2]
+        for key in heaps
+        for item in sorted(heaps[key], key=lambda item: item[:2], reverse=True)
+    ]
+
+
+def grouped_top_k(criteria, groups, k, metric, fields, use_window=None):
+    """Lista de {"group": {...}, "players": [...]}, ordenada pelos valores do grupo."""
+    if use_window is None:
+        use_window = connection.features.supports_over_clause
+
+    queryset = filter_players(Player.objects.all(), criteria)
+    rows, partition, order = _rows(queryset, groups, metric, fields)
+    group_columns = [GROUPS[group] for group in groups]
+    rank = RANKED_GROUPS.get(groups[0]) if len(groups) == 1 else None
+
+    if rank and metric == 'overall' and not criteria and rankings_ready():
+        # Leitura de intervalo do índice (grupo, rank)
+        top = rows.filter(**{f'{rank}__lte': k}).order_by(*group_columns, rank)
+    elif use_window:
+        top = _window_top_k(rows, partition, order, k).order_by(*group_columns, 'group_rank')
+    else:
+        top = _heap_top_k(rows, group_columns, metric, k)
+
+    result = {}
+    for row in top:
+        key = tuple(row[column] for column in group_columns)
+        group = result.get(key)
+        if group is None:
+            group = result[key] = {'group': dict(zip(groups, key)), 'players': []}
+        group['players'].append(player_data(row, fields))
+    return [result[key] for key in sorted(result)]
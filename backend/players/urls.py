@@ -1,17 +1,27 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import PlayerListView, PlayerFilterView, TopKPlayersView, PlayerDetailView, PlayerSearchView, TopPlayersByCriteriaView, BestTeamView, PlayerImageView
+from .views import PlayerListView, PlayerFilterView, TopKPlayersView, GroupedTopKView, PlayerDetailView, PlayerBatchView, SimilarPlayersView, SimilarPlayersBatchView, PlayerSearchView, PlayerAutocompleteView, PlayerExportView, TopPlayersByCriteriaView, BestTeamView, BudgetTeamView, ClubSummaryView, LeagueSummaryView, PlayerImageView, PlayerSpriteView
 
 urlpatterns = [
     path('players/', PlayerListView.as_view(), name='players-list'),
     path('players/search/', PlayerSearchView.as_view(), name='players-search'),
+    path('players/autocomplete/', PlayerAutocompleteView.as_view(), name='players-autocomplete'),
     path('players/filter/', PlayerFilterView.as_view(), name='players-filter'),
     path('players/top-k/', TopKPlayersView.as_view(), name='players-top-k'),
+    path('players/top-k/grouped/', GroupedTopKView.as_view(), name='players-top-k-grouped'),
+    path('players/export/', PlayerExportView.as_view(), name='players-export'),
+    path('players/batch/', PlayerBatchView.as_view(), name='players-batch'),
+    path('players/similar/', SimilarPlayersBatchView.as_view(), name='players-similar-batch'),
     path('players/<int:sofifa_id>/', PlayerDetailView.as_view(), name='player-detail'),
+    path('players/<int:sofifa_id>/similar/', SimilarPlayersView.as_view(), name='player-similar'),
     path('players/top-by-criteria/', TopPlayersByCriteriaView.as_view(), name='players-top-k-by-criteria'),
     path('players/best-team/', BestTeamView.as_view(), name='best-team'),
+    path('players/best-team/budget/', BudgetTeamView.as_view(), name='best-team-budget'),
     path('players/image/<int:sofifa_id>/', PlayerImageView.as_view(), name='player-image'),
+    path('players/image/sprite/', PlayerSpriteView.as_view(), name='player-sprite'),
+    path('clubs/', ClubSummaryView.as_view(), name='clubs-list'),
+    path('leagues/', LeagueSummaryView.as_view(), name='leagues-list'),
 ]
 
 
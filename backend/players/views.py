@@ -1,229 +1,703 @@
+import csv
+import hashlib
+import io
+import math
 import os
+from contextlib import nullcontext
+from itertools import islice
+import orjson
 import requests
 from django.core.files import File
-from django.http import HttpResponse, Http404
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, Http404, JsonResponse, StreamingHttpResponse,
+)
 from django.views import View
 from django.shortcuts import render
 from rest_framework import generics, status
 from django.conf import settings
-from django.http import FileResponse
+from django.db.models import F, Window
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q
-from .models import Player
-from .serializers import PlayerSerializer
-from .pagination import StandardResultsSetPagination
+from . import dataset
+from .autocomplete import TYPES as AUTOCOMPLETE_TYPES, get_autocomplete_index
+from .budget import MAX_TIME_LIMIT, SQUAD_METRICS, budget_lineup
+from .facets import db_facets, index_facets, parse_facets
+from .filters import POSITION_FILTER, filter_players, parse_criteria, search_players
+from .images import find_image, render_sprite, requested_size, serve_image, sprite_etag
+from .index import METRICS, get_player_index
+from .models import ClubSummary, LeagueSummary, Player, PlayerPosition, split_positions
+from .rankings import top_overall
+from .serializers import (
+    PLAYER_FIELDS, ClubSummarySerializer, LeagueSummarySerializer, PlayerSerializer, player_data,
+    player_instance_data, player_values, project, query_columns, selected_fields,
+)
+from .similar import get_similarity_index, parse_k
+from .topk import LIST_DEFAULT_K, LIST_MAX_K, grouped_top_k, parse_grouping, parse_top_k
+from .solver import best_lineup, parse_formation
+from .pagination import PlayerPagination, StandardResultsSetPagination
+from .response_cache import get_response_cache, response_key
+from .singleflight import process_lock, single_flight
+
+def dataset_etag(request, *args, **kwargs):
+    # Same dataset version + same URL and Accept = same response
+    variant = f"{request.get_full_path()}|{request.headers.get('Accept', '')}"
+    return f"{dataset.current_version()}-{hashlib.sha1(variant.encode()).hexdigest()[:16]}"
+
+
+def dataset_last_modified(request, *args, **kwargs):
+    return dataset.last_modified()
+
+
+# ETag/Last-Modified driven by the dataset version; a matching If-None-Match
+# gets a 304 before the view touches the database or the index.
+class DatasetConditionalMixin:
+    def dispatch(self, request, *args, **kwargs):
+        response = self.conditional_dispatch(request, *args, **kwargs)
+        # Responses marked no-store (e.g. partial results) must not be revalidated either
+        if 'no-store' in response.get('Cache-Control', ''):
+            for header in ('ETag', 'Last-Modified'):
+                if response.has_header(header):
+                    del response[header]
+        return response
+
+    @method_decorator(condition(etag_func=dataset_etag, last_modified_func=dataset_last_modified))
+    def conditional_dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+# Rendered responses cached per endpoint, normalized query and dataset version.
+# Concurrent identical misses are coalesced: one request computes, the others
+# share its result (across workers too, when the cache backend is shared).
+class ResponseCacheMixin:
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return super().dispatch(request, *args, **kwargs)
+
+        endpoint = request.resolver_match.url_name if request.resolver_match else type(self).__name__
+        cache = get_response_cache()
+        if cache is not None and not cache.ttl(endpoint):
+            cache = None
+        key = response_key(endpoint, request)
+
+        if cache is not None:
+            cached = cache.get(endpoint, key)
+            if cached is not None:
+                return self.cached_response(cached, 'HIT')
+
+        result, shared = single_flight(
+            key, lambda: self.compute_response(cache, endpoint, key, request, *args, **kwargs)
+        )
+        if not shared:
+            return result[0]
+        if result is None or result[1] is None:
+            # The leader failed or its response can't be shared: compute our own
+            return super().dispatch(request, *args, **kwargs)
+        if cache is not None:
+            cache.count(endpoint, 'coalesced')
+        return self.cached_response(result[1], 'COALESCED')
+
+    def compute_response(self, cache, endpoint, key, request, *args, **kwargs):
+        shared_cache = cache is not None and cache.backend.shared
+        with process_lock(key) if shared_cache else nullcontext():
+            if shared_cache:
+                # Another worker may have filled the cache while we waited for the lock
+                cached = cache.backend.get(key)
+                if cached is not None:
+                    return self.cached_response(cached, 'HIT'), cached
+
+            response = super().dispatch(request, *args, **kwargs)
+            rendered = None
+            # Only successful JSON responses; the browsable API is never shared
+            renderer = getattr(response, 'accepted_renderer', None)
+            if response.status_code == 200 and renderer is not None and renderer.format == 'json':
+                response.render()
+                rendered = (response.status_code, list(response.items()), response.content)
+                # Responses the view won't store are still shared with coalesced requests
+                if cache is not None and self.cacheable(response):
+                    cache.set(endpoint, key, rendered)
+            if cache is not None:
+                response['X-Cache'] = 'MISS'
+            return response, rendered
+
+    def cacheable(self, response):
+        return True
+
+    @staticmethod
+    def cached_response(cached, state):
+        status_code, headers, content = cached
+        response = HttpResponse(content, status=status_code)
+        for name, value in headers:
+            response[name] = value
+        response['X-Cache'] = state
+        return response
+
+# Read-only fast path: .values() rows mapped straight to the PlayerSerializer output.
+# ?fields= / ?exclude= trim both the output and the columns read from the database.
+class PlayerValuesMixin:
+    def get_fields(self):
+        return selected_fields(self.request.query_params)
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        rows = player_values(self.filter_queryset(self.get_queryset()), fields)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([player_data(row, fields) for row in page])
+        return Response([player_data(row, fields) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        lookup = {self.lookup_field: self.kwargs[self.lookup_field]}
+        row = player_values(self.get_queryset().filter(**lookup), fields).first()
+        if row is None:
+            raise Http404("No Player matches the given query.")
+        return Response(player_data(row, fields))
 
 # List all players (with pagination)
-class PlayerListView(generics.ListAPIView):
+class PlayerListView(DatasetConditionalMixin, ResponseCacheMixin, PlayerValuesMixin, generics.ListAPIView):
     serializer_class = PlayerSerializer
-    queryset = Player.objects.all().order_by('-overall')
-    pagination_class = StandardResultsSetPagination
+    queryset = Player.objects.all().order_by('-overall', 'sofifa_id')
+    pagination_class = PlayerPagination
+
+# Serve list endpoints from the in-memory player index when it is enabled.
+# By default the rows are the players matching get_criteria(), in listing order.
+class PlayerIndexMixin(PlayerValuesMixin):
+    def get_index_rows(self, index):
+        return index.filter(self.get_criteria())
+
+    def list(self, request, *args, **kwargs):
+        index = get_player_index()
+        if index is None:
+            return super().list(request, *args, **kwargs)
+
+        fields = self.get_fields()
+        rows = self.get_index_rows(index)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(project(page, fields))
+        return Response(project(rows, fields))
 
 # Filter players by various criteria
-class PlayerFilterView(generics.ListAPIView):
+class PlayerFilterView(DatasetConditionalMixin, ResponseCacheMixin, PlayerIndexMixin, generics.ListAPIView):
     serializer_class = PlayerSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = PlayerPagination
+
+    def get_criteria(self):
+        return parse_criteria(self.request.query_params)
 
     def get_queryset(self):
-        queryset = Player.objects.all()
-        
-        # Get all filter parameters
-        short_name = self.request.query_params.get('short_name')
-        long_name = self.request.query_params.get('long_name')
-        club_name = self.request.query_params.get('club_name')
-        league_name = self.request.query_params.get('league_name')
-        nationality = self.request.query_params.get('nationality')
-        player_positions = self.request.query_params.get('player_positions')
-        age_min = self.request.query_params.get('age_min')
-        age_max = self.request.query_params.get('age_max')
-        overall_min = self.request.query_params.get('overall_min')
-        overall_max = self.request.query_params.get('overall_max')
-        
-        # Apply filters
-        if short_name:
-            queryset = queryset.filter(short_name__icontains=short_name)
-        if long_name:
-            queryset = queryset.filter(long_name__icontains=long_name)
-        if club_name:
-            queryset = queryset.filter(club_name__icontains=club_name)
-        if league_name:
-            queryset = queryset.filter(league_name__icontains=league_name)
-        if nationality:
-            queryset = queryset.filter(nationality__icontains=nationality)
-        if player_positions:
-            queryset = queryset.filter(player_positions__icontains=player_positions)
-            
-        if age_min:
-            try:
-                age_min = int(age_min)
-                queryset = queryset.filter(age__gte=age_min)
-            except ValueError:
-                pass
-            
-        if age_max:
-            try:
-                age_max = int(age_max)
-                queryset = queryset.filter(age__lte=age_max)
-            except ValueError:
-                pass
-            
-        if overall_min:
-            queryset = queryset.filter(overall__gte=overall_min)
-        if overall_max:
-            queryset = queryset.filter(overall__lte=overall_max)
-            
-        return queryset
+        queryset = filter_players(Player.objects.all(), self.get_criteria())
+        return queryset.order_by('-overall', 'sofifa_id')
+
+    def list(self, request, *args, **kwargs):
+        # ?facets=league_name,club_name,... adds counts per value to the page
+        facets, limit = parse_facets(request.query_params)
+        response = super().list(request, *args, **kwargs)
+        if facets:
+            index = get_player_index()
+            if index is not None:
+                response.data['facets'] = index_facets(index, self.get_criteria(), facets, limit)
+            else:
+                response.data['facets'] = db_facets(Player.objects.all(), self.get_criteria(), facets, limit)
+        return response
 
 # Top-K players with advanced filtering
-class TopKPlayersView(generics.ListAPIView):
+class TopKPlayersView(DatasetConditionalMixin, ResponseCacheMixin, PlayerIndexMixin, generics.ListAPIView):
     serializer_class = PlayerSerializer
     pagination_class = StandardResultsSetPagination
 
-    def get_queryset(self):
-        k = int(self.request.query_params.get('k', 10))
-        player_positions = self.request.query_params.get('player_positions')
-        nationality = self.request.query_params.get('nationality')
-        league_name = self.request.query_params.get('league_name')
-        club_name = self.request.query_params.get('club_name')
+    def get_criteria(self):
+        return parse_criteria(
+            self.request.query_params,
+            names=('player_positions', 'nationality', 'league_name', 'club_name'),
+        )
 
-        queryset = Player.objects.all()
+    def get_k(self):
+        return parse_top_k(self.request.query_params, LIST_DEFAULT_K, LIST_MAX_K)
 
-        if player_positions:
-            queryset = queryset.filter(player_positions__icontains=player_positions)
-        if nationality:
-            queryset = queryset.filter(nationality__icontains=nationality)
-        if league_name:
-            queryset = queryset.filter(league_name__icontains=league_name)
-        if club_name:
-            queryset = queryset.filter(club_name__icontains=club_name)
+    def get_metric(self):
+        metric = self.request.query_params.get('metric', 'overall')
+        if metric not in METRICS:
+            raise ValidationError({'metric': f"Use one of {', '.join(METRICS)}"})
+        return metric
+
+    def get_index_rows(self, index):
+        return index.top_k(self.get_criteria(), self.get_k(), self.get_metric())
 
-        return queryset.order_by('-overall')[:k]
+    def get_queryset(self):
+        criteria, metric, k = self.get_criteria(), self.get_metric(), self.get_k()
+        # Sem filtros, uma leitura de intervalo do ranking materializado
+        if not criteria and metric == 'overall' and (top := top_overall(k)) is not None:
+            return top
+        queryset = filter_players(Player.objects.all(), criteria)
+        return queryset.order_by(f'-{metric}', 'sofifa_id')[:k]
+
+# Top-k players per group (club, league, nationality and/or position)
+class GroupedTopKView(DatasetConditionalMixin, ResponseCacheMixin, APIView):
+    def get(self, request):
+        groups, k, metric = parse_grouping(request.query_params)
+        criteria = parse_criteria(request.query_params)
+        fields = selected_fields(request.query_params)
+        return Response({
+            'group_by': groups,
+            'metric': metric,
+            'k': k,
+            'groups': grouped_top_k(criteria, groups, k, metric, fields),
+        })
 
 # Player details by ID
-class PlayerDetailView(generics.RetrieveAPIView):
+class PlayerDetailView(DatasetConditionalMixin, PlayerValuesMixin, generics.RetrieveAPIView):
     serializer_class = PlayerSerializer
     queryset = Player.objects.all()
     lookup_field = 'sofifa_id'
 
+# Several players by ID in one request (GET ?ids=1,2,3 or POST {"ids": [...]}),
+# in request order, with the ids that were not found under "missing"
+class PlayerBatchView(DatasetConditionalMixin, PlayerValuesMixin, generics.GenericAPIView):
+    serializer_class = PlayerSerializer
+    queryset = Player.objects.all()
+    max_ids = {'GET': 100, 'POST': 1000}
+
+    def get_ids(self, values):
+        try:
+            ids = list(dict.fromkeys(int(value) for value in values))
+        except (TypeError, ValueError):
+            raise ValidationError({'ids': 'ids must be integers'})
+        if not ids:
+            raise ValidationError({'ids': 'Provide at least one id'})
+        limit = self.max_ids[self.request.method]
+        if len(ids) > limit:
+            raise ValidationError({'ids': f'At most {limit} ids per request'})
+        return ids
+
+    def get_players(self, ids, fields):
+        index = get_player_index()
+        if index is not None:
+            rows = (index.rows[index.row_by_id[sofifa_id]] for sofifa_id in ids if sofifa_id in index.row_by_id)
+            return {row['sofifa_id']: {field: row[field] for field in fields} for row in rows}
+        # A single id__in query
+        queryset = self.get_queryset().filter(sofifa_id__in=ids)
+        return {row['sofifa_id']: player_data(row, fields) for row in player_values(queryset, fields)}
+
+    def batch(self, values):
+        ids = self.get_ids(values)
+        players = self.get_players(ids, self.get_fields())
+        return Response({
+            'results': [players[sofifa_id] for sofifa_id in ids if sofifa_id in players],
+            'missing': [sofifa_id for sofifa_id in ids if sofifa_id not in players],
+        })
+
+    def get(self, request):
+        values = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        return self.batch(values)
+
+    def post(self, request):
+        values = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(values, list):
+            raise ValidationError({'ids': 'Send a JSON body like {"ids": [158023, 20801]}'})
+        return self.batch(values)
+
+# Nearest neighbours of one or more players over normalized attributes
+# (players.similar), restricted by the usual filters (?league_name=, ?value_max=...)
+class SimilarPlayersMixin:
+    def get_similar(self, ids):
+        params = self.request.query_params
+        k = parse_k(params)
+        index = get_similarity_index()
+        return index.players, index.neighbours(ids, k, parse_criteria(params))
+
+    def similar_data(self, players, neighbours, fields):
+        return [
+            {**{field: players.rows[row][field] for field in fields}, 'distance': round(distance, 4)}
+            for row, distance in neighbours
+        ]
+
+class SimilarPlayersView(DatasetConditionalMixin, SimilarPlayersMixin, PlayerValuesMixin, generics.GenericAPIView):
+    serializer_class = PlayerSerializer
+
+    def get(self, request, sofifa_id):
+        players, neighbours = self.get_similar([sofifa_id])
+        if sofifa_id not in neighbours:
+            raise NotFound()
+        fields = self.get_fields()
+        player = players.rows[players.row_by_id[sofifa_id]]
+        return Response({
+            'player': {field: player[field] for field in fields},
+            'results': self.similar_data(players, neighbours[sofifa_id], fields),
+        })
+
+# Batch variant for scouting jobs: GET ?ids= or POST {"ids": [...]}, one
+# list of neighbours per id, in request order
+class SimilarPlayersBatchView(SimilarPlayersMixin, PlayerBatchView):
+    def batch(self, values):
+        ids = self.get_ids(values)
+        players, neighbours = self.get_similar(ids)
+        fields = self.get_fields()
+        return Response({
+            'results': [
+                {'sofifa_id': sofifa_id, 'similar': self.similar_data(players, neighbours[sofifa_id], fields)}
+                for sofifa_id in ids if sofifa_id in neighbours
+            ],
+            'missing': [sofifa_id for sofifa_id in ids if sofifa_id not in neighbours],
+        })
+
 # Search players by name
-class PlayerSearchView(generics.ListAPIView):
+class PlayerSearchView(DatasetConditionalMixin, ResponseCacheMixin, PlayerValuesMixin, generics.ListAPIView):
     serializer_class = PlayerSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = PlayerPagination
 
     def get_queryset(self):
         query = self.request.query_params.get('q', '')
+        queryset = Player.objects.all()
         if query:
-            return Player.objects.filter(
-                Q(short_name__icontains=query) | 
-                Q(long_name__icontains=query)
-            )
-        return Player.objects.all()
+            queryset = search_players(queryset, query)
+        return queryset.order_by('-overall', 'sofifa_id')
+
+# Autocomplete over player, club and league names (accent-insensitive prefixes)
+class PlayerAutocompleteView(DatasetConditionalMixin, APIView):
+    max_limit = 50
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'limit must be an integer'})
+        types = [kind.strip() for kind in request.query_params.get('types', '').split(',') if kind.strip()]
+        if set(types) - set(AUTOCOMPLETE_TYPES):
+            raise ValidationError({'types': f"Use {', '.join(AUTOCOMPLETE_TYPES)}"})
+
+        index = get_autocomplete_index()
+        results = index.search(request.query_params.get('q', ''), limit, types or AUTOCOMPLETE_TYPES)
+        return Response({'results': results})
+
+# Streaming export of filtered players (?format=csv|ndjson), with flat memory:
+# rows come from a server-side cursor and are written out chunk by chunk.
+# A plain Django view, since DRF reserves ?format= for renderer selection.
+class PlayerExportView(DatasetConditionalMixin, View):
+    chunk_size = 2000
+    formats = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in self.formats:
+            return JsonResponse({'format': f"Use {' or '.join(self.formats)}"}, status=400)
+        try:
+            fields = selected_fields(request.GET)
+            criteria = parse_criteria(request.GET)
+        except ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+
+        queryset = filter_players(Player.objects.all(), criteria)
+        if request.GET.get('q'):
+            queryset = search_players(queryset, request.GET['q'])
+        rows = player_values(queryset.order_by('-overall', 'sofifa_id'), fields).iterator(chunk_size=self.chunk_size)
+        players = (player_data(row, fields) for row in rows)
+
+        if export_format == 'csv':
+            content = self.csv_chunks(players, fields)
+        else:
+            content = self.ndjson_chunks(players)
+        response = StreamingHttpResponse(content, content_type=self.formats[export_format])
+        response['Content-Disposition'] = f'attachment; filename="players.{export_format}"'
+        return response
+
+    def batches(self, players):
+        while True:
+            batch = list(islice(players, self.chunk_size))
+            if not batch:
+                return
+            yield batch
+
+    def csv_chunks(self, players, fields):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        for batch in self.batches(players):
+            writer.writerows([player[field] for field in fields] for player in batch)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def ndjson_chunks(self, players):
+        for batch in self.batches(players):
+            yield b''.join(orjson.dumps(player) + b'\n' for player in batch)
 
 # Top players by specific criteria
-class TopPlayersByCriteriaView(generics.ListAPIView):
+class TopPlayersByCriteriaView(DatasetConditionalMixin, ResponseCacheMixin, PlayerIndexMixin, generics.ListAPIView):
     serializer_class = PlayerSerializer
     pagination_class = StandardResultsSetPagination
 
-    def get_queryset(self):
-        k = int(self.request.query_params.get('k', 10))
+    CRITERIA_FIELDS = {
+        'position': 'player_positions',
+        'nationality': 'nationality',
+        'league': 'league_name',
+        'club': 'club_name',
+    }
+
+    def get_criteria(self):
         criteria = self.request.query_params.get('criteria', 'overall')
         value = self.request.query_params.get('value')
-        
-        queryset = Player.objects.all()
-        
-        if criteria == 'position' and value:
-            queryset = queryset.filter(player_positions__icontains=value)
-        elif criteria == 'nationality' and value:
-            queryset = queryset.filter(nationality__icontains=value)
-        elif criteria == 'league' and value:
-            queryset = queryset.filter(league_name__icontains=value)
-        elif criteria == 'club' and value:
-            queryset = queryset.filter(club_name__icontains=value)
-            
-        return queryset.order_by('-overall')[:k]
+        field = self.CRITERIA_FIELDS.get(criteria)
+        if not field or not value:
+            return {}
+        if field == POSITION_FILTER:
+            return {field: split_positions(value)}
+        return {field: value}
+
+    def get_k(self):
+        return parse_top_k(self.request.query_params, LIST_DEFAULT_K, LIST_MAX_K)
+
+    def get_index_rows(self, index):
+        return index.top_k(self.get_criteria(), self.get_k())
+
+    def get_queryset(self):
+        criteria, k = self.get_criteria(), self.get_k()
+        if not criteria and (top := top_overall(k)) is not None:
+            return top
+        queryset = filter_players(Player.objects.all(), criteria)
+        return queryset.order_by('-overall', 'sofifa_id')[:k]
 
 # Best team formation
-class BestTeamView(APIView):
+class BestTeamView(DatasetConditionalMixin, ResponseCacheMixin, APIView):
+    def get_candidates(self, queryset, slots, fields=PLAYER_FIELDS):
+        # Only the columns needed by the solver and by the requested fields
+        columns = query_columns(fields) + ('player_positions',)
+
+        # Only the top len(slots) players of each position can be part of an
+        # optimal lineup, so the pool is bounded regardless of league size.
+        ranked = PlayerPosition.objects.filter(
+            player__in=queryset,
+            position__in=set(slots),
+        ).annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F('position'),
+                order_by=[F('player__overall').desc(), F('player_id').asc()],
+            ),
+        ).filter(rank__lte=len(slots)).select_related('player').only(
+            'position', *(f'player__{column}' for column in columns)
+        )
+
+        players = {item.player_id: item.player for item in ranked}
+        # Best overall players, used out of position when a slot has no candidate
+        for player in queryset.only(*columns).order_by('-overall', 'sofifa_id')[:len(slots)]:
+            players.setdefault(player.sofifa_id, player)
+
+        return [
+            (player, set(split_positions(player.player_positions)), player.overall)
+            for player in players.values()
+        ]
+
     def get(self, request):
         formation = request.query_params.get('formation', '4-3-3')
         league_name = request.query_params.get('league_name')
         nationality = request.query_params.get('nationality')
-        
+
+        try:
+            slots = parse_formation(formation)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = selected_fields(request.query_params)
         queryset = Player.objects.all()
-        
+
         if league_name:
             queryset = queryset.filter(league_name__icontains=league_name)
         if nationality:
             queryset = queryset.filter(nationality__icontains=nationality)
-        
-        # Define positions for 4-3-3 formation
-        positions = {
-            'GK': 1,
-            'RB': 1,
-            'CB': 2,
-            'LB': 1,
-            'CDM': 1,
-            'CM': 2,
-            'LW': 1,
-            'ST': 1,
-            'RW': 1
-        }
-        
-        team = []
-        used_players = set()
-        
-        for position, count in positions.items():
-            players = queryset.filter(
-                player_positions__icontains=position
-            ).order_by('-overall')
-            chosen = 0
-            for player in players:
-                if player.sofifa_id not in used_players:
-                    team.append({"player": player, "position": position})
-                    used_players.add(player.sofifa_id)
-                    chosen += 1
-                if chosen >= count:
-                    break
-        
-        if len(team) < 11:
-            remaining = queryset.exclude(sofifa_id__in=used_players).order_by('-overall')
-            for player in remaining:
-                for pos, cnt in positions.items():
-                    current_count = len([t for t in team if t["position"] == pos])
-                    if current_count < cnt:
-                        team.append({"player": player, "position": pos})
-                        used_players.add(player.sofifa_id)
-                        break
-                if len(team) >= 11:
-                    break
-        
-                
+
+        lineup = best_lineup(slots, self.get_candidates(queryset, slots, fields))
+
         # Serializa jogadores + posição escolhida
         result = []
-        for item in team:
-            player = item.get("player")
-            
-            if isinstance(player, Player):
-                player_data = PlayerSerializer(player).data
-                player_data["chosen_position"] = item.get("position", "")
-                result.append(player_data)
-
+        for position, player in lineup:
+            data = player_instance_data(player, fields)
+            data["chosen_position"] = position
+            result.append(data)
 
         return Response(result)
 
+# Best lineup whose total value_eur fits a budget (players.budget), maximizing
+# overall or potential. Stops at ?time_limit= seconds with the best lineup
+# found so far ("optimal": false).
+class BudgetTeamView(DatasetConditionalMixin, ResponseCacheMixin, APIView):
+    def get_number(self, name, default=None):
+        value = self.request.query_params.get(name, default)
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: f'{name} must be a positive number'})
+        if not math.isfinite(number) or number <= 0:
+            raise ValidationError({name: f'{name} must be a positive number'})
+        return number
+
+    def get_players(self, criteria, budget, metric, fields):
+        criteria = {**criteria, 'value_max': min(criteria.get('value_max', math.inf), budget)}
+        index = get_player_index()
+        if index is not None:
+            return [(row, {field: row[field] for field in fields}) for row in index.filter(criteria)]
+        columns = tuple(dict.fromkeys(query_columns(fields) + ('player_positions', 'value_eur', metric)))
+        rows = filter_players(Player.objects.all(), criteria).values(*columns)
+        return [(row, player_data(row, fields)) for row in rows]
+
+    def cacheable(self, response):
+        # A lineup cut short by the time limit may be beaten by the next request
+        return response.data['optimal']
+
+    def get(self, request):
+        formation = request.query_params.get('formation', '4-3-3')
+        try:
+            slots = parse_formation(formation)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        budget = self.get_number('budget')
+        time_limit = min(self.get_number('time_limit', settings.PLAYERS_SQUAD_TIME_LIMIT), MAX_TIME_LIMIT)
+        metric = request.query_params.get('metric', 'overall')
+        if metric not in SQUAD_METRICS:
+            raise ValidationError({'metric': f"Use one of {', '.join(SQUAD_METRICS)}"})
+        fields = selected_fields(request.query_params)
+
+        players = self.get_players(parse_criteria(request.query_params), budget, metric, fields)
+        lineup, optimal = budget_lineup(slots, [row for row, _ in players], budget, metric, time_limit)
+        if lineup is None and not optimal:
+            response = Response(
+                {"detail": "Time limit reached before any lineup was found; try a larger time_limit"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            patch_cache_control(response, no_store=True)
+            return response
+        if lineup is None:
+            raise ValidationError({'budget': 'No lineup fits within the budget'})
+
+        data = {row['sofifa_id']: output for row, output in players}
+        response = Response({
+            'formation': formation,
+            'metric': metric,
+            'budget': budget,
+            'optimal': optimal,
+            'total_score': sum(row[metric] for _, row in lineup),
+            'total_value_eur': sum(row['value_eur'] or 0 for _, row in lineup),
+            'players': [{**data[row['sofifa_id']], 'chosen_position': position} for position, row in lineup],
+        })
+        if not optimal:
+            # A later request may find a better lineup: no browser or CDN copies
+            patch_cache_control(response, no_store=True)
+        return response
+
+# Club and league leaderboards, read from the summary tables kept by
+# players.summaries (one indexed read per page, no player rows involved)
+class GroupSummaryView(DatasetConditionalMixin, generics.ListAPIView):
+    pagination_class = StandardResultsSetPagination
+    model = None
+    ordering_fields = ('name', 'player_count', 'avg_overall', 'avg_age', 'total_value_eur', 'best_xi_rating')
+    filter_fields = ()
+
+    def get_ordering(self):
+        ordering = self.request.query_params.get('ordering', '-avg_overall')
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({
+                'ordering': f"Use one of {', '.join(self.ordering_fields)}, optionally prefixed with '-'"
+            })
+        return [ordering] if ordering.lstrip('-') == 'name' else [ordering, 'name']
+
+    def get_queryset(self):
+        queryset = self.model.objects.all()
+        query = self.request.query_params.get('q')
+        if query:
+            queryset = queryset.filter(name__icontains=query)
+        for name in self.filter_fields:
+            value = self.request.query_params.get(name)
+            if value:
+                queryset = queryset.filter(**{f'{name}__icontains': value})
+        return queryset.order_by(*self.get_ordering())
+
+class ClubSummaryView(GroupSummaryView):
+    model = ClubSummary
+    serializer_class = ClubSummarySerializer
+    filter_fields = ('league_name',)
+
+class LeagueSummaryView(GroupSummaryView):
+    model = LeagueSummary
+    serializer_class = LeagueSummarySerializer
+    ordering_fields = GroupSummaryView.ordering_fields + ('club_count',)
+
 
 class PlayerImageView(View):
     def get(self, request, sofifa_id: int):
+        # Resolve the file straight from sofifa_id, without touching the database
+        # Smaller WebP/AVIF variants chosen by ?size= and the Accept header
+        image = find_image(sofifa_id, requested_size(request), request.headers.get('Accept', ''))
+        if image is None:
+            raise Http404("Player image not found")
+
+        response = serve_image(request, *image)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+# Sprite sheet with the faces of a page of players, in a single request
+class PlayerSpriteView(View):
+    max_ids = 100
+    max_columns = 20
+
+    def get_ids(self, request):
+        if request.GET.get('ids'):
+            ids = [int(value) for value in request.GET['ids'].split(',') if value.strip()]
+            if len(ids) > self.max_ids:
+                raise ValueError(f"At most {self.max_ids} ids per sprite")
+            return ids
+
+        # Same page as PlayerListView (?page=&page_size=)
+        paginator = StandardResultsSetPagination()
+        page_size = paginator.get_page_size(Request(request)) or paginator.page_size
+        page = max(int(request.GET.get('page', 1)), 1)
+        start = (page - 1) * page_size
+
+        index = get_player_index()
+        if index is not None:
+            rows = index.filter({})[start:start + page_size]
+            return [row['sofifa_id'] for row in rows]
+        queryset = Player.objects.order_by('-overall', 'sofifa_id').values_list('sofifa_id', flat=True)
+        return list(queryset[start:start + page_size])
+
+    def get(self, request):
         try:
-            player = Player.objects.get(sofifa_id=sofifa_id)
-            if not player.real_face_local:
-                raise Http404("Player image not found")
+            ids = self.get_ids(request)
+            columns = min(max(int(request.GET.get('columns', 10)), 1), self.max_columns)
+        except ValueError as exc:
+            return HttpResponseBadRequest(str(exc))
+
+        size = requested_size(request)
+        image_format = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'png'
+        etag = sprite_etag(ids, size, columns, image_format)
 
-            # Use o atributo 'path' do ImageFieldFile para pegar o caminho físico
-            filepath = player.real_face_local.path
-            return FileResponse(open(filepath, 'rb'), content_type='image/png')
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                render_sprite(ids, size, columns, image_format),
+                content_type=f'image/{image_format}',
+            )
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.PLAYERS_IMAGE_MAX_AGE}'
+        response['X-Sprite-Ids'] = ','.join(str(sofifa_id) for sofifa_id in ids)
+        response['X-Sprite-Columns'] = str(columns)
+        response['X-Sprite-Tile-Size'] = str(size)
+        patch_vary_headers(response, ('Accept',))
+        return response
 
-        except Player.DoesNotExist:
-            raise Http404("Player not found")
-    
\ No newline at end of file